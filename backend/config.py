@@ -1,7 +1,7 @@
 """
 Configuration and database connection
 """
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient
 from dotenv import load_dotenv
 from pathlib import Path
 import os
@@ -11,8 +11,23 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncMongoClient(
+    mongo_url,
+    # Routes fan out several queries at once (analytics, imports), so leave headroom above request concurrency
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', 100)),
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', 10)),
+    # Let idle connections above minPoolSize go after a quiet minute
+    maxIdleTimeMS=int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 60000)),
+    serverSelectionTimeoutMS=int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+    # Fail a request that can't get a connection instead of letting it queue behind an exhausted pool
+    waitQueueTimeoutMS=int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 10000)),
+    # Compress wire traffic when the server supports it - list payloads are highly repetitive
+    compressors=os.environ.get('MONGO_COMPRESSORS', 'zstd,zlib'),
+    retryWrites=True,
+    tz_aware=True
+)
 db = client[os.environ['DB_NAME']]
+# Collection indexes are declared in services/db_service.py and built at startup
 
 # JWT Settings
 SECRET_KEY = os.environ.get('JWT_SECRET', 'your-super-secret-key-change-in-production')
@@ -22,6 +37,9 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 # Upload directories
 UPLOAD_DIR = ROOT_DIR / "uploads" / "voice"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+MAX_VOICE_UPLOAD_BYTES = int(os.environ.get('MAX_VOICE_UPLOAD_MB', 20)) * 1024 * 1024
+# Internal nginx location aliased to UPLOAD_DIR; when set, nginx serves voice files via X-Accel-Redirect
+VOICE_ACCEL_REDIRECT_PREFIX = os.environ.get('VOICE_ACCEL_REDIRECT_PREFIX')
 
 # CORS
 CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*').split(',')
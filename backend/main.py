@@ -3,10 +3,13 @@ TG Sender - Telegram Bot Manager API
 Main application entry point
 """
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from starlette.middleware.cors import CORSMiddleware
+import asyncio
 import logging
 
 from config import CORS_ORIGINS, client
+from services.db_service import ensure_indexes, migrate_string_timestamps
 
 # Import routers
 from routers import auth, accounts, contacts, campaigns, templates, dialogs, analytics, voice, followup, telegram
@@ -19,7 +22,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="TG Sender API",
     description="Telegram Bot Manager for mass outreach campaigns",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Include routers with /api prefix
@@ -45,15 +49,25 @@ app.add_middleware(
 
 
 @app.get("/api/")
-async def root():
+def root():
     return {"message": "TG Sender API v2.0", "status": "ok"}
 
 
 @app.get("/api/health")
-async def health_check():
+def health_check():
     return {"status": "healthy"}
 
 
+@app.on_event("startup")
+async def warm_up_db():
+    # uvicorn picks uvloop automatically when it is installed - make that visible in the logs
+    logger.info(f"Event loop: {type(asyncio.get_running_loop()).__module__}")
+    # Open the pool now instead of on the first request
+    await client.admin.command("ping")
+    await ensure_indexes()
+    await migrate_string_timestamps()
+
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    await client.close()
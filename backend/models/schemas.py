@@ -3,6 +3,7 @@ Pydantic models for request/response validation
 """
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 from typing import List, Optional
+from datetime import datetime
 
 
 # ==================== AUTH MODELS ====================
@@ -94,8 +95,8 @@ class ContactResponse(BaseModel):
     name: Optional[str]
     tags: List[str]
     status: str
-    created_at: str
-    last_contacted: Optional[str]
+    created_at: datetime
+    last_contacted: Optional[datetime]
 
 
 # ==================== CAMPAIGN MODELS ====================
@@ -140,7 +141,7 @@ class DialogResponse(BaseModel):
     account_id: str
     account_phone: str
     messages: List[dict]
-    last_message_at: str
+    last_message_at: datetime
     has_response: bool
 
 
@@ -158,8 +159,8 @@ class TemplateResponse(BaseModel):
     name: str
     content: str
     description: Optional[str]
-    created_at: str
-    updated_at: Optional[str]
+    created_at: datetime
+    updated_at: Optional[datetime]
 
 
 # ==================== VOICE MESSAGE MODELS ====================
@@ -170,6 +171,10 @@ class VoiceMessageCreate(BaseModel):
     delay_minutes: int = 30
 
 
+class VoiceMessageBulkDelete(BaseModel):
+    ids: List[str]
+
+
 class VoiceMessageResponse(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str
@@ -192,8 +197,8 @@ class FollowUpQueueResponse(BaseModel):
     contact_phone: str
     contact_name: Optional[str]
     status: str
-    read_at: str
-    scheduled_at: str
+    read_at: datetime
+    scheduled_at: datetime
     voice_message_id: Optional[str]
     voice_message_name: Optional[str]
 
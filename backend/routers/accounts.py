@@ -1,20 +1,35 @@
 """
 Telegram accounts routes
 """
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Request
+from pydantic import TypeAdapter
 from typing import List, Optional
 from datetime import datetime, timezone
 import uuid
-import json
-import pandas as pd
-from io import BytesIO
+import io
+import orjson
+from pymongo.errors import DuplicateKeyError
 
 from config import db
 from models.schemas import TelegramAccountCreate, TelegramAccountResponse
 from services.auth_service import get_current_user
+from services.cache_service import bump_list_version, cached_list_response
+from services.db_service import PRIMARY_ACK_WRITE_CONCERN, aggregate_first, facet_count, insert_batches, new_ids
+from services.import_service import iter_csv_rows, normalize_phone
 
 router = APIRouter(prefix="/accounts", tags=["accounts"])
 
+IMPORT_BATCH_SIZE = 1000
+
+ACCOUNT_LIST_ADAPTER = TypeAdapter(List[TelegramAccountResponse])
+
+# Only what TelegramAccountResponse renders - keeps api_hash/session_string off the wire
+ACCOUNT_RESPONSE_PROJECTION = {
+    "_id": 0, "id": 1, "phone": 1, "name": 1, "status": 1, "proxy": 1, "limits": 1,
+    "value_usdt": 1, "messages_sent_today": 1, "messages_sent_hour": 1,
+    "total_messages_sent": 1, "total_messages_delivered": 1, "created_at": 1, "last_active": 1
+}
+
 
 def get_price_category(value_usdt: float) -> str:
     if value_usdt < 300:
@@ -26,6 +41,7 @@ def get_price_category(value_usdt: float) -> str:
 
 @router.get("", response_model=List[TelegramAccountResponse])
 async def get_accounts(
+    request: Request,
     price_category: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
@@ -37,14 +53,20 @@ async def get_accounts(
         query["value_usdt"] = {"$gte": 300, "$lt": 500}
     elif price_category == "high":
         query["value_usdt"] = {"$gte": 500}
+    else:
+        price_category = "all"
     
-    accounts = await db.telegram_accounts.find(query, {"_id": 0}).to_list(1000)
-    
-    for acc in accounts:
-        value = acc.get("value_usdt", 0)
-        acc["price_category"] = get_price_category(value)
+    async def render() -> bytes:
+        accounts = await db.telegram_accounts.find(query, ACCOUNT_RESPONSE_PROJECTION).to_list(1000)
+        
+        for acc in accounts:
+            value = acc.get("value_usdt", 0)
+            acc["price_category"] = get_price_category(value)
+        
+        # Serialize the whole list in one pydantic-core call
+        return ACCOUNT_LIST_ADAPTER.dump_json([TelegramAccountResponse.model_construct(**acc) for acc in accounts])
     
-    return [TelegramAccountResponse(**acc) for acc in accounts]
+    return await cached_list_response(request, current_user["id"], "accounts", price_category, render)
 
 
 @router.get("/stats")
@@ -52,19 +74,24 @@ async def get_accounts_stats(current_user: dict = Depends(get_current_user)):
     """Get account counts by price category"""
     user_id = current_user["id"]
     
-    low_count = await db.telegram_accounts.count_documents({
-        "user_id": user_id,
-        "$or": [{"value_usdt": {"$lt": 300}}, {"value_usdt": {"$exists": False}}]
-    })
-    medium_count = await db.telegram_accounts.count_documents({
-        "user_id": user_id,
-        "value_usdt": {"$gte": 300, "$lt": 500}
-    })
-    high_count = await db.telegram_accounts.count_documents({
-        "user_id": user_id,
-        "value_usdt": {"$gte": 500}
-    })
-    total = await db.telegram_accounts.count_documents({"user_id": user_id})
+    stats = await aggregate_first(db.telegram_accounts, [
+        {"$match": {"user_id": user_id}},
+        {"$project": {"_id": 0, "value_usdt": 1}},
+        {"$facet": {
+            "low": [
+                {"$match": {"$or": [{"value_usdt": {"$lt": 300}}, {"value_usdt": {"$exists": False}}]}},
+                {"$count": "n"}
+            ],
+            "medium": [{"$match": {"value_usdt": {"$gte": 300, "$lt": 500}}}, {"$count": "n"}],
+            "high": [{"$match": {"value_usdt": {"$gte": 500}}}, {"$count": "n"}],
+            "total": [{"$count": "n"}]
+        }}
+    ])
+    
+    low_count = facet_count(stats, "low")
+    medium_count = facet_count(stats, "medium")
+    high_count = facet_count(stats, "high")
+    total = facet_count(stats, "total")
     
     return {
         "total": total,
@@ -83,6 +110,7 @@ async def create_account(account: TelegramAccountCreate, current_user: dict = De
     
     value_usdt = account.value_usdt or 0
     price_category = get_price_category(value_usdt)
+    now = datetime.now(timezone.utc).isoformat()
     
     account_doc = {
         "id": account_id,
@@ -101,13 +129,20 @@ async def create_account(account: TelegramAccountCreate, current_user: dict = De
         "messages_sent_hour": 0,
         "total_messages_sent": 0,
         "total_messages_delivered": 0,
-        "last_hour_reset": datetime.now(timezone.utc).isoformat(),
-        "last_day_reset": datetime.now(timezone.utc).isoformat(),
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "last_hour_reset": now,
+        "last_day_reset": now,
+        "created_at": now,
         "last_active": None
     }
-    await db.telegram_accounts.insert_one(account_doc)
-    return TelegramAccountResponse(**{k: v for k, v in account_doc.items() if k not in ["user_id", "api_id", "api_hash", "session_string"]})
+    try:
+        await db.telegram_accounts.insert_one(account_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Account with this phone already exists")
+    await bump_list_version(current_user["id"], "accounts")
+    # insert_one added _id - strip it and the credentials in place rather than copying the doc
+    for key in ("_id", "user_id", "api_id", "api_hash", "session_string"):
+        account_doc.pop(key, None)
+    return TelegramAccountResponse.model_construct(**account_doc)
 
 
 @router.put("/{account_id}", response_model=TelegramAccountResponse)
@@ -136,38 +171,50 @@ async def update_account(account_id: str, account: TelegramAccountCreate, curren
     if account.limits:
         update_data["limits"] = account.limits.model_dump()
     
-    await db.telegram_accounts.update_one({"id": account_id}, {"$set": update_data})
+    try:
+        await db.telegram_accounts.update_one({"id": account_id}, {"$set": update_data})
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Account with this phone already exists")
+    await bump_list_version(current_user["id"], "accounts")
     
-    updated = await db.telegram_accounts.find_one({"id": account_id}, {"_id": 0})
+    updated = await db.telegram_accounts.find_one({"id": account_id}, ACCOUNT_RESPONSE_PROJECTION)
     updated["price_category"] = get_price_category(updated.get("value_usdt", 0))
-    return TelegramAccountResponse(**{k: v for k, v in updated.items() if k not in ["user_id", "api_id", "api_hash", "session_string"]})
+    return TelegramAccountResponse.model_construct(**updated)
 
 
 @router.post("/import")
 async def import_accounts(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
-    content = await file.read()
+    # Parse straight from the spooled upload instead of copying it into memory first
     accounts = []
     
     if file.filename.endswith('.json'):
-        data = json.loads(content.decode('utf-8'))
+        data = orjson.loads(await file.read())
         accounts = data if isinstance(data, list) else [data]
     elif file.filename.endswith('.csv'):
-        df = pd.read_csv(BytesIO(content))
-        accounts = df.to_dict('records')
+        # Empty cells are dropped so acc.get() falls back to defaults
+        accounts = iter_csv_rows(io.TextIOWrapper(file.file, encoding='utf-8-sig', newline=''))
     else:
         raise HTTPException(status_code=400, detail="Unsupported file format. Use JSON or CSV")
     
-    imported = 0
+    rows = []
+    seen_phones = set()
     for acc in accounts:
-        account_id = str(uuid.uuid4())
-        phone = str(acc.get('phone', '')).strip()
-        if not phone:
+        phone = normalize_phone(acc.get('phone'))
+        if phone is None or phone in seen_phones:
             continue
-        
-        existing = await db.telegram_accounts.find_one({"phone": phone, "user_id": current_user["id"]})
-        if existing:
-            continue
-        
+        seen_phones.add(phone)
+        rows.append((phone, acc))
+    
+    existing_cursor = db.telegram_accounts.find(
+        {"user_id": current_user["id"], "phone": {"$in": list(seen_phones)}},
+        {"_id": 0, "phone": 1}
+    )
+    existing_phones = {doc["phone"] async for doc in existing_cursor}
+    rows = [(phone, acc) for phone, acc in rows if phone not in existing_phones]
+    
+    now = datetime.now(timezone.utc).isoformat()
+    account_docs = []
+    for account_id, (phone, acc) in zip(new_ids(len(rows)), rows):
         value_usdt = float(acc.get('value_usdt', 0)) if acc.get('value_usdt') else 0
         
         proxy_data = {
@@ -186,7 +233,7 @@ async def import_accounts(file: UploadFile = File(...), current_user: dict = Dep
             "delay_max": int(acc.get('delay_max', 90))
         }
         
-        account_doc = {
+        account_docs.append({
             "id": account_id,
             "user_id": current_user["id"],
             "phone": phone,
@@ -203,13 +250,21 @@ async def import_accounts(file: UploadFile = File(...), current_user: dict = Dep
             "messages_sent_hour": 0,
             "total_messages_sent": 0,
             "total_messages_delivered": 0,
-            "last_hour_reset": datetime.now(timezone.utc).isoformat(),
-            "last_day_reset": datetime.now(timezone.utc).isoformat(),
-            "created_at": datetime.now(timezone.utc).isoformat(),
+            "last_hour_reset": now,
+            "last_day_reset": now,
+            "created_at": now,
             "last_active": None
-        }
-        await db.telegram_accounts.insert_one(account_doc)
-        imported += 1
+        })
+    
+    imported = 0
+    if account_docs:
+        # The unique (user_id, phone) index still rejects phones inserted concurrently since the lookup
+        imported, _ = await insert_batches(
+            db.telegram_accounts.with_options(write_concern=PRIMARY_ACK_WRITE_CONCERN),
+            account_docs,
+            IMPORT_BATCH_SIZE
+        )
+        await bump_list_version(current_user["id"], "accounts")
     
     return {"message": f"Successfully imported {imported} accounts", "imported": imported}
 
@@ -225,6 +280,7 @@ async def update_account_status(account_id: str, status: str, current_user: dict
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Account not found")
+    await bump_list_version(current_user["id"], "accounts")
     return {"message": "Status updated"}
 
 
@@ -233,4 +289,5 @@ async def delete_account(account_id: str, current_user: dict = Depends(get_curre
     result = await db.telegram_accounts.delete_one({"id": account_id, "user_id": current_user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Account not found")
+    await bump_list_version(current_user["id"], "accounts")
     return {"message": "Account deleted"}
@@ -3,57 +3,112 @@ Analytics routes
 """
 from fastapi import APIRouter, Depends
 from datetime import datetime, timezone, timedelta
+from typing import List
+import asyncio
 
 from config import db
 from models.schemas import AnalyticsResponse
 from services.auth_service import get_current_user
+from services.cache_service import analytics_cache
+from services.db_service import aggregate_first, count_by_status, facet_count
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
+# Contact statuses that mean at least one message went out
+MESSAGED_STATUSES = ("messaged", "responded", "read", "voice_sent")
+
+
+async def get_daily_stats(user_id: str, days: int = 7) -> List[dict]:
+    """Sent/delivered/response counts per day, taken from dialog messages"""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    days_back = [today - timedelta(days=days - 1 - i) for i in range(days)]
+    since = days_back[0]
+    outgoing = {"$eq": ["$messages.direction", "outgoing"]}
+    
+    cursor = await db.dialogs.aggregate([
+        {"$match": {"user_id": user_id, "last_message_at": {"$gte": since}}},
+        # Trim each dialog to the window before unwinding so old history never becomes documents
+        {"$project": {"_id": 0, "messages": {"$filter": {
+            "input": "$messages",
+            "as": "m",
+            "cond": {"$gte": ["$$m.sent_at", since]}
+        }}}},
+        {"$unwind": "$messages"},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$messages.sent_at"}},
+            "sent": {"$sum": {"$cond": [outgoing, 1, 0]}},
+            "delivered": {"$sum": {"$cond": [
+                {"$and": [outgoing, {"$eq": ["$messages.status", "delivered"]}]}, 1, 0
+            ]}},
+            "responses": {"$sum": {"$cond": [{"$eq": ["$messages.direction", "incoming"]}, 1, 0]}}
+        }}
+    ])
+    by_day = {row["_id"]: row async for row in cursor}
+    
+    daily_stats = []
+    for day in days_back:
+        date = day.strftime("%Y-%m-%d")
+        row = by_day.get(date, {})
+        daily_stats.append({
+            "date": date,
+            "sent": row.get("sent", 0),
+            "delivered": row.get("delivered", 0),
+            "responses": row.get("responses", 0)
+        })
+    
+    return daily_stats
+
 
 @router.get("", response_model=AnalyticsResponse)
 async def get_analytics(current_user: dict = Depends(get_current_user)):
     user_id = current_user["id"]
+    cached = analytics_cache.get(user_id)
+    if cached is not None:
+        return cached
     
-    total_accounts = await db.telegram_accounts.count_documents({"user_id": user_id})
-    active_accounts = await db.telegram_accounts.count_documents({"user_id": user_id, "status": "active"})
-    banned_accounts = await db.telegram_accounts.count_documents({"user_id": user_id, "status": "banned"})
+    # Account and contact counts are one $group per collection, covered by the (user_id, status) indexes
+    account_counts, contact_counts, campaigns_facet, daily_stats = await asyncio.gather(
+        count_by_status(db.telegram_accounts, {"user_id": user_id}),
+        count_by_status(db.contacts, {"user_id": user_id}),
+        aggregate_first(db.campaigns, [
+            {"$match": {"user_id": user_id}},
+            # Leave message templates and contact_ids lists behind before the facet
+            {"$project": {"_id": 0, "status": 1, "messages_sent": 1, "messages_delivered": 1, "responses_count": 1}},
+            {"$facet": {
+                "total": [{"$count": "n"}],
+                "running": [{"$match": {"status": "running"}}, {"$count": "n"}],
+                "stats": [{"$group": {
+                    "_id": None,
+                    "total_sent": {"$sum": "$messages_sent"},
+                    "total_delivered": {"$sum": "$messages_delivered"},
+                    "total_responses": {"$sum": "$responses_count"}
+                }}]
+            }}
+        ]),
+        get_daily_stats(user_id)
+    )
     
-    total_contacts = await db.contacts.count_documents({"user_id": user_id})
-    messaged_contacts = await db.contacts.count_documents({"user_id": user_id, "status": {"$in": ["messaged", "responded", "read", "voice_sent"]}})
-    responded_contacts = await db.contacts.count_documents({"user_id": user_id, "status": "responded"})
+    total_accounts = sum(account_counts.values())
+    active_accounts = account_counts.get("active", 0)
+    banned_accounts = account_counts.get("banned", 0)
     
-    total_campaigns = await db.campaigns.count_documents({"user_id": user_id})
-    running_campaigns = await db.campaigns.count_documents({"user_id": user_id, "status": "running"})
+    total_contacts = sum(contact_counts.values())
+    messaged_contacts = sum(contact_counts.get(status, 0) for status in MESSAGED_STATUSES)
+    responded_contacts = contact_counts.get("responded", 0)
     
-    campaign_stats = await db.campaigns.aggregate([
-        {"$match": {"user_id": user_id}},
-        {"$group": {
-            "_id": None,
-            "total_sent": {"$sum": "$messages_sent"},
-            "total_delivered": {"$sum": "$messages_delivered"},
-            "total_responses": {"$sum": "$responses_count"}
-        }}
-    ]).to_list(1)
+    total_campaigns = facet_count(campaigns_facet, "total")
+    running_campaigns = facet_count(campaigns_facet, "running")
     
-    total_messages_sent = campaign_stats[0].get("total_sent", 0) if campaign_stats else 0
-    total_messages_delivered = campaign_stats[0].get("total_delivered", 0) if campaign_stats else 0
-    total_responses = campaign_stats[0].get("total_responses", 0) if campaign_stats else 0
+    # Message totals come from the per-campaign counters; there is no separate messages collection to scan
+    campaign_stats = (campaigns_facet.get("stats") or [{}])[0]
+    total_messages_sent = campaign_stats.get("total_sent", 0)
+    total_messages_delivered = campaign_stats.get("total_delivered", 0)
+    total_responses = campaign_stats.get("total_responses", 0)
     
     delivery_rate = (total_messages_delivered / total_messages_sent * 100) if total_messages_sent > 0 else 0
     response_rate = (total_responses / total_messages_delivered * 100) if total_messages_delivered > 0 else 0
     
-    daily_stats = []
-    for i in range(7):
-        day = datetime.now(timezone.utc) - timedelta(days=6-i)
-        daily_stats.append({
-            "date": day.strftime("%Y-%m-%d"),
-            "sent": int(total_messages_sent / 7 * (0.8 + 0.4 * (i / 6))) if total_messages_sent > 0 else 0,
-            "delivered": int(total_messages_delivered / 7 * (0.8 + 0.4 * (i / 6))) if total_messages_delivered > 0 else 0,
-            "responses": int(total_responses / 7 * (0.8 + 0.4 * (i / 6))) if total_responses > 0 else 0
-        })
-    
-    return AnalyticsResponse(
+    analytics = AnalyticsResponse(
         total_accounts=total_accounts,
         active_accounts=active_accounts,
         banned_accounts=banned_accounts,
@@ -69,3 +124,5 @@ async def get_analytics(current_user: dict = Depends(get_current_user)):
         response_rate=round(response_rate, 1),
         daily_stats=daily_stats
     )
+    analytics_cache[user_id] = analytics
+    return analytics
@@ -4,11 +4,12 @@ Authentication routes
 from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime, timezone
 import uuid
+from pymongo.errors import DuplicateKeyError
 
 from config import db
 from models.schemas import UserCreate, UserLogin, UserResponse, Token
 from services.auth_service import (
-    get_password_hash, verify_password, create_access_token, get_current_user
+    get_password_hash, verify_password, create_access_token, get_current_user, cache_user
 )
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -16,8 +17,7 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/register", response_model=Token)
 async def register(user_data: UserCreate):
-    existing = await db.users.find_one({"email": user_data.email})
-    if existing:
+    if await db.users.find_one({"email": user_data.email}, {"_id": 1}):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     user_id = str(uuid.uuid4())
@@ -25,36 +25,42 @@ async def register(user_data: UserCreate):
         "id": user_id,
         "email": user_data.email,
         "name": user_data.name,
-        "password_hash": get_password_hash(user_data.password),
+        "password_hash": await get_password_hash(user_data.password),
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    await db.users.insert_one(user_doc)
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     access_token = create_access_token(data={"sub": user_id})
+    cache_user(access_token, user_doc)
     return Token(
         access_token=access_token,
         token_type="bearer",
-        user=UserResponse(id=user_id, email=user_data.email, name=user_data.name, created_at=user_doc["created_at"])
+        user=UserResponse.model_construct(id=user_id, email=user_data.email, name=user_data.name, created_at=user_doc["created_at"])
     )
 
 
 @router.post("/login", response_model=Token)
 async def login(user_data: UserLogin):
     user = await db.users.find_one({"email": user_data.email}, {"_id": 0})
-    if not user or not verify_password(user_data.password, user["password_hash"]):
+    if not user or not await verify_password(user_data.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token = create_access_token(data={"sub": user["id"]})
+    cache_user(access_token, user)
     return Token(
         access_token=access_token,
         token_type="bearer",
-        user=UserResponse(id=user["id"], email=user["email"], name=user["name"], created_at=user["created_at"])
+        user=UserResponse.model_construct(id=user["id"], email=user["email"], name=user["name"], created_at=user["created_at"])
     )
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: dict = Depends(get_current_user)):
-    return UserResponse(
+def get_me(current_user: dict = Depends(get_current_user)):
+    # Stored user fields were validated on register - skip re-running EmailStr on every call
+    return UserResponse.model_construct(
         id=current_user["id"],
         email=current_user["email"],
         name=current_user["name"],
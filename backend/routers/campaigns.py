@@ -1,7 +1,8 @@
 """
 Campaigns routes
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from pydantic import TypeAdapter
 from typing import List
 from datetime import datetime, timezone
 import uuid
@@ -9,15 +10,27 @@ import uuid
 from config import db
 from models.schemas import CampaignCreate, CampaignResponse
 from services.auth_service import get_current_user
+from services.cache_service import bump_list_version, cached_list_response
 from services.campaign_service import execute_campaign
 
 router = APIRouter(prefix="/campaigns", tags=["campaigns"])
 
+CAMPAIGN_LIST_ADAPTER = TypeAdapter(List[CampaignResponse])
+
+CAMPAIGN_RESPONSE_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "message_template": 1, "status": 1, "use_rotation": 1,
+    "account_categories": 1, "total_contacts": 1, "messages_sent": 1, "messages_delivered": 1,
+    "messages_failed": 1, "responses_count": 1, "created_at": 1, "started_at": 1, "completed_at": 1
+}
+
 
 @router.get("", response_model=List[CampaignResponse])
-async def get_campaigns(current_user: dict = Depends(get_current_user)):
-    campaigns = await db.campaigns.find({"user_id": current_user["id"]}, {"_id": 0}).to_list(1000)
-    return [CampaignResponse(**c) for c in campaigns]
+async def get_campaigns(request: Request, current_user: dict = Depends(get_current_user)):
+    async def render() -> bytes:
+        campaigns = await db.campaigns.find({"user_id": current_user["id"]}, CAMPAIGN_RESPONSE_PROJECTION).to_list(1000)
+        return CAMPAIGN_LIST_ADAPTER.dump_json([CampaignResponse.model_construct(**c) for c in campaigns])
+    
+    return await cached_list_response(request, current_user["id"], "campaigns", "all", render)
 
 
 @router.post("", response_model=CampaignResponse)
@@ -54,31 +67,41 @@ async def create_campaign(campaign: CampaignCreate, current_user: dict = Depends
         "completed_at": None
     }
     await db.campaigns.insert_one(campaign_doc)
-    return CampaignResponse(**{k: v for k, v in campaign_doc.items() if k != "user_id"})
+    await bump_list_version(current_user["id"], "campaigns")
+    campaign_doc.pop("_id", None)
+    campaign_doc.pop("user_id")
+    return CampaignResponse.model_construct(**campaign_doc)
 
 
 @router.put("/{campaign_id}/start")
 async def start_campaign(campaign_id: str, current_user: dict = Depends(get_current_user)):
-    campaign = await db.campaigns.find_one({"id": campaign_id, "user_id": current_user["id"]})
+    # Claim the campaign atomically so two starts can't both run it
+    campaign = await db.campaigns.find_one_and_update(
+        {"id": campaign_id, "user_id": current_user["id"], "status": {"$ne": "running"}},
+        {"$set": {"status": "running", "started_at": datetime.now(timezone.utc).isoformat()}},
+        projection={"_id": 0}
+    )
     if not campaign:
+        if await db.campaigns.find_one({"id": campaign_id, "user_id": current_user["id"]}, {"_id": 1}):
+            raise HTTPException(status_code=400, detail="Campaign is already running")
         raise HTTPException(status_code=404, detail="Campaign not found")
-    
-    if campaign["status"] == "running":
-        raise HTTPException(status_code=400, detail="Campaign is already running")
-    
-    await db.campaigns.update_one(
-        {"id": campaign_id},
-        {"$set": {"status": "running", "started_at": datetime.now(timezone.utc).isoformat()}}
-    )
+    await bump_list_version(current_user["id"], "campaigns")
     
     # Execute campaign with smart rotation
-    result = await execute_campaign(campaign, current_user["id"])
+    try:
+        result = await execute_campaign(campaign, current_user["id"])
+    except Exception:
+        # Release the claim so a campaign that crashed mid-send isn't stuck as running
+        await db.campaigns.update_one({"id": campaign_id}, {"$set": {"status": "draft"}})
+        await bump_list_version(current_user["id"], "campaigns")
+        raise
     
     if "error" in result:
         await db.campaigns.update_one(
             {"id": campaign_id},
             {"$set": {"status": "draft"}}
         )
+        await bump_list_version(current_user["id"], "campaigns")
         raise HTTPException(status_code=400, detail=result["error"])
     
     await db.campaigns.update_one(
@@ -92,6 +115,7 @@ async def start_campaign(campaign_id: str, current_user: dict = Depends(get_curr
             "completed_at": datetime.now(timezone.utc).isoformat()
         }}
     )
+    await bump_list_version(current_user["id"], "campaigns")
     
     return {
         "message": "Campaign completed",
@@ -110,4 +134,5 @@ async def delete_campaign(campaign_id: str, current_user: dict = Depends(get_cur
     result = await db.campaigns.delete_one({"id": campaign_id, "user_id": current_user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Campaign not found")
+    await bump_list_version(current_user["id"], "campaigns")
     return {"message": "Campaign deleted"}
@@ -1,31 +1,134 @@
 """
 Contacts routes
 """
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
 from typing import List, Optional
 from datetime import datetime, timezone
 import uuid
-import json
-import pandas as pd
-from io import BytesIO
+import io
+import orjson
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
 
 from config import db
 from models.schemas import ContactCreate, ContactResponse
 from services.auth_service import get_current_user
+from services.cache_service import invalidate_analytics
+from services.db_service import insert_batches, new_ids
+from services.import_service import iter_csv_rows, iter_excel_rows, normalize_phone
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
+IMPORT_BATCH_SIZE = 1000
+CONTACT_LIST_ADAPTER = TypeAdapter(List[ContactResponse])
+CONTACT_ADAPTER = TypeAdapter(ContactResponse)
 
-@router.get("", response_model=List[ContactResponse])
-async def get_contacts(tag: Optional[str] = None, status: Optional[str] = None, current_user: dict = Depends(get_current_user)):
-    query = {"user_id": current_user["id"]}
+# Exactly the ContactResponse fields, so every list format renders the same shape
+CONTACT_RESPONSE_PROJECTION = {
+    "_id": 0, "id": 1, "phone": 1, "name": 1, "tags": 1, "status": 1, "created_at": 1, "last_contacted": 1
+}
+IMPORT_CHUNK_SIZE = 5000
+
+# Column aliases accepted in import files, most common first
+PHONE_KEYS = ('phone', 'Phone', 'номер', 'Номер')
+NAME_KEYS = ('name', 'Name', 'имя', 'Имя')
+
+
+def first_value(row: dict, keys: tuple):
+    """Return the value of the first alias present in the row"""
+    for key in keys:
+        value = row.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def row_tags(row: dict) -> list:
+    """Tags given in an import row, as a list"""
+    tags = row.get('tags')
+    if tags is None:
+        return []
+    return tags if isinstance(tags, list) else [tags]
+
+
+async def import_contact_chunk(user_id: str, rows: list, tag: Optional[str], now: datetime) -> int:
+    """Insert the new contacts among (phone, row) pairs, tag the ones that already exist, return the insert count"""
+    phones = [phone for phone, _ in rows]
+    existing_cursor = db.contacts.find({"user_id": user_id, "phone": {"$in": phones}}, {"_id": 0, "phone": 1})
+    existing_phones = {doc["phone"] async for doc in existing_cursor}
+    new_rows = [(phone, c) for phone, c in rows if phone not in existing_phones]
+    
+    contact_docs = []
+    for contact_id, (phone, c) in zip(new_ids(len(new_rows)), new_rows):
+        contact_docs.append({
+            "id": contact_id,
+            "user_id": user_id,
+            "phone": phone,
+            "name": first_value(c, NAME_KEYS),
+            "tags": row_tags(c),
+            "status": "pending",
+            "created_at": now,
+            "last_contacted": None
+        })
+    
+    # The unique (user_id, phone) index still rejects phones inserted concurrently since the lookup
+    imported, duplicates = await insert_batches(db.contacts, contact_docs, IMPORT_BATCH_SIZE)
+    existing_phones.update(doc["phone"] for doc in duplicates)
+    
+    # Re-imported contacts pick up the file's tags server-side instead of being skipped outright
+    tag_updates = [
+        UpdateOne({"user_id": user_id, "phone": phone}, {"$addToSet": {"tags": {"$each": tags}}})
+        for phone, c in rows if phone in existing_phones and (tags := row_tags(c))
+    ]
+    if tag_updates:
+        await db.contacts.bulk_write(tag_updates, ordered=False)
+    
+    if tag:
+        await db.contacts.update_many(
+            {"user_id": user_id, "phone": {"$in": phones}},
+            {"$addToSet": {"tags": tag}}
+        )
+    
+    return imported
+
+
+def find_contacts(user_id: str, tag: Optional[str], status: Optional[str], limit: int, offset: int):
+    """Cursor over a user's contacts for the list endpoints"""
+    query = {"user_id": user_id}
     if tag:
         query["tags"] = tag
     if status:
         query["status"] = status
+    # created_at + id gives a total order, so skip/limit pages never overlap or drop rows
+    return db.contacts.find(query, CONTACT_RESPONSE_PROJECTION).sort([("created_at", 1), ("id", 1)]).skip(offset).limit(limit).batch_size(min(limit, 500))
+
+
+@router.get("", response_model=List[ContactResponse], responses={
+    200: {"description": "JSON array, or one contact per line with format=ndjson", "content": {"application/x-ndjson": {}}}
+})
+async def get_contacts(
+    tag: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(10000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    cursor = find_contacts(current_user["id"], tag, status, limit, offset)
     
-    contacts = await db.contacts.find(query, {"_id": 0}).to_list(10000)
-    return [ContactResponse(**c) for c in contacts]
+    if format == "ndjson":
+        # One contact per line, written as cursor batches arrive
+        async def stream_rows():
+            async for c in cursor:
+                yield CONTACT_ADAPTER.dump_json(ContactResponse.model_construct(**c)) + b"\n"
+        
+        return StreamingResponse(stream_rows(), media_type="application/x-ndjson")
+    
+    # Serialize the page in one pydantic-core call instead of FastAPI re-validating every row
+    contacts = [ContactResponse.model_construct(**c) async for c in cursor]
+    return Response(CONTACT_LIST_ADAPTER.dump_json(contacts), media_type="application/json")
 
 
 @router.post("", response_model=ContactResponse)
@@ -38,59 +141,51 @@ async def create_contact(contact: ContactCreate, current_user: dict = Depends(ge
         "name": contact.name,
         "tags": contact.tags or [],
         "status": "pending",
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": datetime.now(timezone.utc),
         "last_contacted": None
     }
-    await db.contacts.insert_one(contact_doc)
-    return ContactResponse(**{k: v for k, v in contact_doc.items() if k != "user_id"})
+    try:
+        await db.contacts.insert_one(contact_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Contact with this phone already exists")
+    invalidate_analytics(current_user["id"])
+    contact_doc.pop("_id", None)
+    contact_doc.pop("user_id")
+    return ContactResponse.model_construct(**contact_doc)
 
 
 @router.post("/import")
 async def import_contacts(file: UploadFile = File(...), tag: Optional[str] = None, current_user: dict = Depends(get_current_user)):
-    content = await file.read()
+    # UploadFile is already spooled to disk past 1 MB - parse from it rather than copying it into memory
     contacts = []
     
     if file.filename.endswith('.json'):
-        data = json.loads(content.decode('utf-8'))
+        data = orjson.loads(await file.read())
         contacts = data if isinstance(data, list) else [data]
     elif file.filename.endswith('.csv'):
-        df = pd.read_csv(BytesIO(content))
-        contacts = df.to_dict('records')
+        contacts = iter_csv_rows(io.TextIOWrapper(file.file, encoding='utf-8-sig', newline=''))
     elif file.filename.endswith(('.xlsx', '.xls')):
-        df = pd.read_excel(BytesIO(content))
-        contacts = df.to_dict('records')
+        contacts = iter_excel_rows(file.file)
     else:
         raise HTTPException(status_code=400, detail="Unsupported file format")
     
+    # Dedupe, insert and tag chunk by chunk so only one chunk of rows is held at a time
+    now = datetime.now(timezone.utc)
     imported = 0
+    seen_phones = set()
+    chunk = []
     for c in contacts:
-        contact_id = str(uuid.uuid4())
-        phone = str(c.get('phone', c.get('Phone', c.get('номер', c.get('Номер', ''))))).strip()
-        if not phone:
-            continue
-        
-        existing = await db.contacts.find_one({"phone": phone, "user_id": current_user["id"]})
-        if existing:
+        phone = normalize_phone(first_value(c, PHONE_KEYS))
+        if phone is None or phone in seen_phones:
             continue
-        
-        tags = []
-        if tag:
-            tags.append(tag)
-        if 'tags' in c:
-            tags.extend(c['tags'] if isinstance(c['tags'], list) else [c['tags']])
-        
-        contact_doc = {
-            "id": contact_id,
-            "user_id": current_user["id"],
-            "phone": phone,
-            "name": c.get('name', c.get('Name', c.get('имя', c.get('Имя')))),
-            "tags": tags,
-            "status": "pending",
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "last_contacted": None
-        }
-        await db.contacts.insert_one(contact_doc)
-        imported += 1
+        seen_phones.add(phone)
+        chunk.append((phone, c))
+        if len(chunk) == IMPORT_CHUNK_SIZE:
+            imported += await import_contact_chunk(current_user["id"], chunk, tag, now)
+            chunk = []
+    if chunk:
+        imported += await import_contact_chunk(current_user["id"], chunk, tag, now)
+    invalidate_analytics(current_user["id"])
     
     return {"message": f"Successfully imported {imported} contacts", "imported": imported}
 
@@ -100,7 +195,7 @@ async def mark_contact_read(contact_id: str, current_user: dict = Depends(get_cu
     """Mark contact as read (for testing follow-up logic)"""
     result = await db.contacts.update_one(
         {"id": contact_id, "user_id": current_user["id"]},
-        {"$set": {"status": "read", "read_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"status": "read", "read_at": datetime.now(timezone.utc)}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Contact not found")
@@ -112,10 +207,12 @@ async def delete_contact(contact_id: str, current_user: dict = Depends(get_curre
     result = await db.contacts.delete_one({"id": contact_id, "user_id": current_user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Contact not found")
+    invalidate_analytics(current_user["id"])
     return {"message": "Contact deleted"}
 
 
 @router.delete("")
 async def delete_all_contacts(current_user: dict = Depends(get_current_user)):
     result = await db.contacts.delete_many({"user_id": current_user["id"]})
+    invalidate_analytics(current_user["id"])
     return {"message": f"Deleted {result.deleted_count} contacts"}
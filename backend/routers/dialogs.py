@@ -1,7 +1,9 @@
 """
 Dialogs routes
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import Response
+from pydantic import TypeAdapter
 from typing import List, Optional
 from datetime import datetime, timezone
 import uuid
@@ -12,15 +14,24 @@ from services.auth_service import get_current_user
 
 router = APIRouter(prefix="/dialogs", tags=["dialogs"])
 
+DIALOG_LIST_ADAPTER = TypeAdapter(List[DialogResponse])
+
 
 @router.get("", response_model=List[DialogResponse])
-async def get_dialogs(has_response: Optional[bool] = None, current_user: dict = Depends(get_current_user)):
+async def get_dialogs(
+    has_response: Optional[bool] = None,
+    limit: int = Query(500, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    current_user: dict = Depends(get_current_user)
+):
     query = {"user_id": current_user["id"]}
     if has_response is not None:
         query["has_response"] = has_response
     
-    dialogs = await db.dialogs.find(query, {"_id": 0}).sort("last_message_at", -1).to_list(500)
-    return [DialogResponse(**d) for d in dialogs]
+    # The list only previews each dialog's latest message; GET /dialogs/{id} returns the full history
+    cursor = db.dialogs.find(query, {"_id": 0, "user_id": 0, "messages": {"$slice": -1}}).sort([("last_message_at", -1), ("id", -1)]).skip(offset).limit(limit).batch_size(min(limit, 500))
+    items = [DialogResponse.model_construct(**d) async for d in cursor]
+    return Response(DIALOG_LIST_ADAPTER.dump_json(items), media_type="application/json")
 
 
 @router.get("/{dialog_id}", response_model=DialogResponse)
@@ -28,29 +39,28 @@ async def get_dialog(dialog_id: str, current_user: dict = Depends(get_current_us
     dialog = await db.dialogs.find_one({"id": dialog_id, "user_id": current_user["id"]}, {"_id": 0})
     if not dialog:
         raise HTTPException(status_code=404, detail="Dialog not found")
-    return DialogResponse(**dialog)
+    return DialogResponse.model_construct(**dialog)
 
 
 @router.post("/{dialog_id}/reply")
 async def reply_to_dialog(dialog_id: str, message: str, current_user: dict = Depends(get_current_user)):
-    dialog = await db.dialogs.find_one({"id": dialog_id, "user_id": current_user["id"]})
-    if not dialog:
-        raise HTTPException(status_code=404, detail="Dialog not found")
-    
+    now = datetime.now(timezone.utc)
     message_entry = {
         "id": str(uuid.uuid4()),
         "direction": "outgoing",
         "text": message,
         "status": "delivered",  # Simulated
-        "sent_at": datetime.now(timezone.utc).isoformat()
+        "sent_at": now
     }
     
-    await db.dialogs.update_one(
-        {"id": dialog_id},
+    result = await db.dialogs.update_one(
+        {"id": dialog_id, "user_id": current_user["id"]},
         {
             "$push": {"messages": message_entry},
-            "$set": {"last_message_at": datetime.now(timezone.utc).isoformat()}
+            "$set": {"last_message_at": now}
         }
     )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Dialog not found")
     
     return {"message": "Reply sent", "message_id": message_entry["id"]}
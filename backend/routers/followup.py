@@ -1,7 +1,9 @@
 """
 Follow-up queue routes - handles "read but not replied" logic
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import Response
+from pydantic import TypeAdapter
 from typing import List, Optional
 from datetime import datetime, timezone
 
@@ -16,18 +18,23 @@ from services.followup_service import (
 
 router = APIRouter(prefix="/followup-queue", tags=["followup"])
 
+QUEUE_LIST_ADAPTER = TypeAdapter(List[FollowUpQueueResponse])
+
 
 @router.get("", response_model=List[FollowUpQueueResponse])
 async def get_queue(
     status: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=500),
+    offset: int = Query(0, ge=0),
     current_user: dict = Depends(get_current_user)
 ):
     query = {"user_id": current_user["id"]}
     if status:
         query["status"] = status
     
-    queue = await db.followup_queue.find(query, {"_id": 0}).sort("scheduled_at", 1).to_list(500)
-    return [FollowUpQueueResponse(**q) for q in queue]
+    cursor = db.followup_queue.find(query, {"_id": 0, "user_id": 0}).sort([("scheduled_at", 1), ("id", 1)]).skip(offset).limit(limit).batch_size(min(limit, 500))
+    items = [FollowUpQueueResponse.model_construct(**q) async for q in cursor]
+    return Response(QUEUE_LIST_ADAPTER.dump_json(items), media_type="application/json")
 
 
 @router.get("/stats")
@@ -69,9 +76,10 @@ async def process_queue(current_user: dict = Depends(get_current_user)):
 @router.delete("/{queue_id}")
 async def cancel_followup(queue_id: str, current_user: dict = Depends(get_current_user)):
     """Cancel a pending follow-up"""
+    now = datetime.now(timezone.utc)
     result = await db.followup_queue.update_one(
         {"id": queue_id, "user_id": current_user["id"], "status": "pending"},
-        {"$set": {"status": "cancelled", "cancelled_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"status": "cancelled", "cancelled_at": now, "completed_at": now}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Queue item not found or already processed")
@@ -80,7 +88,7 @@ async def cancel_followup(queue_id: str, current_user: dict = Depends(get_curren
 
 @router.delete("")
 async def clear_queue(current_user: dict = Depends(get_current_user)):
-    """Clear completed/failed/cancelled items from queue"""
+    """Clear completed/failed/cancelled items from queue now (they also expire a week after completion)"""
     result = await db.followup_queue.delete_many({
         "user_id": current_user["id"],
         "status": {"$in": ["sent", "cancelled", "failed"]}
@@ -1,12 +1,14 @@
 """
 Telegram authorization and messaging routes
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+import asyncio
 
 from config import db
 from services.auth_service import get_current_user
+from services.cache_service import bump_list_version
 from services.telegram_service import (
     start_authorization,
     start_authorization_new,
@@ -21,6 +23,19 @@ from services.telegram_service import (
 
 router = APIRouter(prefix="/telegram", tags=["telegram"])
 
+# Routes only read a handful of account fields - skip the rest of the document
+AUTH_PROJECTION = {"_id": 0, "phone": 1, "proxy": 1}
+SEND_PROJECTION = {"_id": 0, "phone": 1, "proxy": 1, "status": 1, "session_string": 1}
+
+
+async def save_account_status(user_id: str, account_id: str, status: str):
+    """Persist a status observed during a check and invalidate the cached list"""
+    await db.telegram_accounts.update_one(
+        {"id": account_id},
+        {"$set": {"status": status}}
+    )
+    await bump_list_version(user_id, "accounts")
+
 
 # Request models for NEW account (without account_id)
 class AuthStartNewRequest(BaseModel):
@@ -78,7 +93,7 @@ async def start_auth_new(request: AuthStartNewRequest, current_user: dict = Depe
     existing = await db.telegram_accounts.find_one({
         "phone": request.phone,
         "user_id": current_user["id"]
-    })
+    }, {"_id": 1})
     
     if existing:
         raise HTTPException(status_code=400, detail="Account with this phone already exists")
@@ -131,7 +146,7 @@ async def start_auth(request: AuthStartRequest, current_user: dict = Depends(get
     account = await db.telegram_accounts.find_one({
         "id": request.account_id,
         "user_id": current_user["id"]
-    })
+    }, AUTH_PROJECTION)
     
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
@@ -151,7 +166,7 @@ async def verify_auth_code(request: CodeVerifyRequest, current_user: dict = Depe
     account = await db.telegram_accounts.find_one({
         "id": request.account_id,
         "user_id": current_user["id"]
-    })
+    }, {**AUTH_PROJECTION, "phone_code_hash": 1})
     
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
@@ -177,7 +192,7 @@ async def verify_2fa_password(request: TwoFARequest, current_user: dict = Depend
     account = await db.telegram_accounts.find_one({
         "id": request.account_id,
         "user_id": current_user["id"]
-    })
+    }, AUTH_PROJECTION)
     
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
@@ -200,7 +215,7 @@ async def send_telegram_message(request: SendMessageRequest, current_user: dict
     account = await db.telegram_accounts.find_one({
         "id": request.account_id,
         "user_id": current_user["id"]
-    })
+    }, SEND_PROJECTION)
     
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
@@ -231,10 +246,16 @@ async def send_telegram_voice(request: SendVoiceRequest, current_user: dict = De
     """Send a voice message via Telegram"""
     from config import UPLOAD_DIR
     
-    account = await db.telegram_accounts.find_one({
-        "id": request.account_id,
-        "user_id": current_user["id"]
-    })
+    account, voice = await asyncio.gather(
+        db.telegram_accounts.find_one({
+            "id": request.account_id,
+            "user_id": current_user["id"]
+        }, SEND_PROJECTION),
+        db.voice_messages.find_one({
+            "id": request.voice_message_id,
+            "user_id": current_user["id"]
+        }, {"_id": 0, "filename": 1})
+    )
     
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
@@ -242,11 +263,6 @@ async def send_telegram_voice(request: SendVoiceRequest, current_user: dict = De
     if account.get("status") != "active":
         raise HTTPException(status_code=400, detail=f"Account is not active")
     
-    voice = await db.voice_messages.find_one({
-        "id": request.voice_message_id,
-        "user_id": current_user["id"]
-    })
-    
     if not voice:
         raise HTTPException(status_code=404, detail="Voice message not found")
     
@@ -268,12 +284,16 @@ async def send_telegram_voice(request: SendVoiceRequest, current_user: dict = De
 
 
 @router.get("/account/{account_id}/status")
-async def get_telegram_account_status(account_id: str, current_user: dict = Depends(get_current_user)):
+async def get_telegram_account_status(
+    account_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
     """Check Telegram account authorization status"""
     account = await db.telegram_accounts.find_one({
         "id": account_id,
         "user_id": current_user["id"]
-    })
+    }, SEND_PROJECTION)
     
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
@@ -288,12 +308,9 @@ async def get_telegram_account_status(account_id: str, current_user: dict = Depe
         proxy=account.get("proxy")
     )
     
-    # Update DB status if changed
+    # Update DB status if changed - the caller already has the result, so don't wait on the write
     if result["status"] in ["banned", "session_expired"]:
-        await db.telegram_accounts.update_one(
-            {"id": account_id},
-            {"$set": {"status": result["status"]}}
-        )
+        background_tasks.add_task(save_account_status, current_user["id"], account_id, result["status"])
     
     return result
 
@@ -304,7 +321,7 @@ async def get_account_fingerprint(account_id: str, current_user: dict = Depends(
     account = await db.telegram_accounts.find_one({
         "id": account_id,
         "user_id": current_user["id"]
-    })
+    }, {"_id": 0, "phone": 1, "fingerprint": 1})
     
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
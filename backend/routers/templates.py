@@ -2,9 +2,12 @@
 Templates routes
 """
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import Response
+from pydantic import TypeAdapter
 from typing import List
 from datetime import datetime, timezone
 import uuid
+from pymongo import ReturnDocument
 
 from config import db
 from models.schemas import TemplateCreate, TemplateResponse
@@ -12,11 +15,13 @@ from services.auth_service import get_current_user
 
 router = APIRouter(prefix="/templates", tags=["templates"])
 
+TEMPLATE_LIST_ADAPTER = TypeAdapter(List[TemplateResponse])
+
 
 @router.get("", response_model=List[TemplateResponse])
 async def get_templates(current_user: dict = Depends(get_current_user)):
-    templates = await db.templates.find({"user_id": current_user["id"]}, {"_id": 0}).to_list(100)
-    return [TemplateResponse(**t) for t in templates]
+    templates = await db.templates.find({"user_id": current_user["id"]}, {"_id": 0, "user_id": 0}).to_list(100)
+    return Response(TEMPLATE_LIST_ADAPTER.dump_json([TemplateResponse.model_construct(**t) for t in templates]), media_type="application/json")
 
 
 @router.post("", response_model=TemplateResponse)
@@ -28,29 +33,32 @@ async def create_template(template: TemplateCreate, current_user: dict = Depends
         "name": template.name,
         "content": template.content,
         "description": template.description,
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": datetime.now(timezone.utc),
         "updated_at": None
     }
     await db.templates.insert_one(template_doc)
-    return TemplateResponse(**{k: v for k, v in template_doc.items() if k != "user_id"})
+    template_doc.pop("_id", None)
+    template_doc.pop("user_id")
+    return TemplateResponse.model_construct(**template_doc)
 
 
 @router.put("/{template_id}", response_model=TemplateResponse)
 async def update_template(template_id: str, template: TemplateCreate, current_user: dict = Depends(get_current_user)):
-    result = await db.templates.update_one(
+    updated = await db.templates.find_one_and_update(
         {"id": template_id, "user_id": current_user["id"]},
         {"$set": {
             "name": template.name,
             "content": template.content,
             "description": template.description,
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }}
+            "updated_at": datetime.now(timezone.utc)
+        }},
+        projection={"_id": 0, "user_id": 0},
+        return_document=ReturnDocument.AFTER
     )
-    if result.matched_count == 0:
+    if not updated:
         raise HTTPException(status_code=404, detail="Template not found")
     
-    updated = await db.templates.find_one({"id": template_id}, {"_id": 0})
-    return TemplateResponse(**{k: v for k, v in updated.items() if k != "user_id"})
+    return TemplateResponse.model_construct(**updated)
 
 
 @router.delete("/{template_id}")
@@ -2,51 +2,124 @@
 Voice messages routes
 """
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
-from fastapi.responses import FileResponse
-from typing import List, Optional
+from fastapi.responses import FileResponse, Response
+from mutagen import File as MutagenFile, MutagenError
+from pydantic import TypeAdapter
+from pymongo import ReturnDocument
+from typing import List, Optional, Tuple
 from datetime import datetime, timezone
+import asyncio
+import mimetypes
 import uuid
 import os
-import shutil
 
-from config import db, UPLOAD_DIR
-from models.schemas import VoiceMessageResponse
+from config import db, UPLOAD_DIR, MAX_VOICE_UPLOAD_BYTES, VOICE_ACCEL_REDIRECT_PREFIX
+from models.schemas import VoiceMessageBulkDelete, VoiceMessageResponse
 from services.auth_service import get_current_user
+from services.db_service import PRIMARY_ACK_WRITE_CONCERN
 
 router = APIRouter(prefix="/voice-messages", tags=["voice"])
 
+COPY_CHUNK_SIZE = 1 << 20
+VOICE_LIST_ADAPTER = TypeAdapter(List[VoiceMessageResponse])
+
+ALLOWED_VOICE_EXTENSIONS = frozenset({'.mp3', '.ogg', '.wav', '.m4a'})
+EXTENSION_ERROR = f"File type not allowed. Use: {', '.join(sorted(ALLOWED_VOICE_EXTENSIONS))}"
+
+VOICE_RESPONSE_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "description": 1, "filename": 1, "duration": 1,
+    "delay_minutes": 1, "is_active": 1, "sent_count": 1, "created_at": 1
+}
+
+
+def copy_upload(src, out) -> int:
+    """Copy an upload into an open file through one reused buffer, whether it is still in memory or spooled to disk"""
+    buf = bytearray(COPY_CHUNK_SIZE)
+    view = memoryview(buf)
+    total = 0
+    while n := src.readinto(view):
+        out.write(view[:n])
+        total += n
+    return total
+
+
+def save_upload(src, dest_path, size_hint: Optional[int] = None) -> int:
+    """Write an upload to dest_path and return its size"""
+    dest_path.parent.mkdir(exist_ok=True)
+    with open(dest_path, "wb") as out:
+        if size_hint and hasattr(os, "posix_fallocate"):
+            try:
+                # Reserve the extents up front so the file lands contiguously on disk
+                os.posix_fallocate(out.fileno(), 0, size_hint)
+            except OSError:
+                pass
+        written = copy_upload(src, out)
+        # Drop any preallocated tail the upload didn't fill
+        out.truncate(written)
+        return written
+
+
+def validated_voice_file(file: UploadFile = File(...)) -> Tuple[UploadFile, str]:
+    """Reject uploads with a disallowed extension or size before anything touches disk"""
+    file_ext = os.path.splitext(file.filename or "")[1].lower()
+    if file_ext not in ALLOWED_VOICE_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=EXTENSION_ERROR)
+    if file.size is not None and file.size > MAX_VOICE_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File too large. Max {MAX_VOICE_UPLOAD_BYTES // (1024 * 1024)} MB")
+    return file, file_ext
+
+
+def probe_duration(path, file_size: int) -> float:
+    """Read the audio duration from the file headers, falling back to a 128 kbps estimate"""
+    try:
+        audio = MutagenFile(path)
+    except MutagenError:
+        audio = None
+    if audio is not None and audio.info and audio.info.length:
+        return audio.info.length
+    return file_size / 16000
+
+
+async def remove_voice_files(filenames: List[str]):
+    """Unlink stored voice files concurrently, off the event loop"""
+    await asyncio.gather(*(
+        asyncio.to_thread((UPLOAD_DIR / filename).unlink, missing_ok=True)
+        for filename in filenames
+    ))
+
 
 @router.get("", response_model=List[VoiceMessageResponse])
 async def get_voice_messages(current_user: dict = Depends(get_current_user)):
-    messages = await db.voice_messages.find({"user_id": current_user["id"]}, {"_id": 0}).to_list(100)
-    return [VoiceMessageResponse(**m) for m in messages]
+    cursor = db.voice_messages.find({"user_id": current_user["id"]}, VOICE_RESPONSE_PROJECTION).limit(100).batch_size(100)
+    messages = [VoiceMessageResponse.model_construct(**m) async for m in cursor]
+    return Response(VOICE_LIST_ADAPTER.dump_json(messages), media_type="application/json")
 
 
 @router.post("")
 async def upload_voice_message(
     name: str,
-    file: UploadFile = File(...),
+    upload: Tuple[UploadFile, str] = Depends(validated_voice_file),
     description: Optional[str] = None,
     delay_minutes: int = 30,
     current_user: dict = Depends(get_current_user)
 ):
-    # Validate file type
-    allowed_types = ['.mp3', '.ogg', '.wav', '.m4a']
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in allowed_types:
-        raise HTTPException(status_code=400, detail=f"File type not allowed. Use: {', '.join(allowed_types)}")
+    file, file_ext = upload
     
-    voice_id = str(uuid.uuid4())
-    filename = f"{voice_id}{file_ext}"
+    voice_id = uuid.uuid4().hex
+    # Shard by id prefix so no single directory grows unbounded; stored paths are relative to UPLOAD_DIR
+    filename = f"{voice_id[:2]}/{voice_id}{file_ext}"
     file_path = UPLOAD_DIR / filename
     
-    # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Save file off the event loop
+    try:
+        file_size = await asyncio.to_thread(save_upload, file.file, file_path, file.size)
+    except OSError:
+        # Don't leave a truncated file behind (e.g. disk full mid-copy)
+        await asyncio.to_thread(file_path.unlink, missing_ok=True)
+        raise HTTPException(status_code=500, detail="Failed to save voice file")
     
-    # Get duration (simplified)
-    file_size = os.path.getsize(file_path)
-    estimated_duration = file_size / 16000
+    # Only the headers are read, straight from the page cache the copy just filled
+    duration = await asyncio.to_thread(probe_duration, file_path, file_size)
     
     voice_doc = {
         "id": voice_id,
@@ -54,54 +127,75 @@ async def upload_voice_message(
         "name": name,
         "description": description,
         "filename": filename,
-        "duration": round(estimated_duration, 1),
+        "duration": round(duration, 1),
         "delay_minutes": delay_minutes,
         "is_active": True,
         "sent_count": 0,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    await db.voice_messages.insert_one(voice_doc)
+    await db.voice_messages.with_options(write_concern=PRIMARY_ACK_WRITE_CONCERN).insert_one(voice_doc)
     
-    return VoiceMessageResponse(**{k: v for k, v in voice_doc.items() if k != "user_id"})
+    voice_doc.pop("_id", None)
+    voice_doc.pop("user_id")
+    return VoiceMessageResponse.model_construct(**voice_doc)
 
 
 @router.get("/{voice_id}/file")
 async def get_voice_file(voice_id: str, current_user: dict = Depends(get_current_user)):
-    voice = await db.voice_messages.find_one({"id": voice_id, "user_id": current_user["id"]})
+    voice = await db.voice_messages.find_one({"id": voice_id, "user_id": current_user["id"]}, {"_id": 0, "filename": 1})
     if not voice:
         raise HTTPException(status_code=404, detail="Voice message not found")
     
+    if VOICE_ACCEL_REDIRECT_PREFIX:
+        # Auth stays here; nginx streams the bytes from disk
+        media_type = mimetypes.guess_type(voice["filename"])[0] or "application/octet-stream"
+        return Response(headers={
+            "X-Accel-Redirect": f"{VOICE_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{voice['filename']}",
+            "Content-Type": media_type
+        })
+    
     file_path = UPLOAD_DIR / voice["filename"]
-    if not file_path.exists():
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(file_path)
+    return FileResponse(file_path, stat_result=stat_result)
 
 
 @router.put("/{voice_id}/toggle")
 async def toggle_voice_message(voice_id: str, current_user: dict = Depends(get_current_user)):
-    voice = await db.voice_messages.find_one({"id": voice_id, "user_id": current_user["id"]})
+    # Flip server-side so concurrent toggles can't both read the same state
+    voice = await db.voice_messages.find_one_and_update(
+        {"id": voice_id, "user_id": current_user["id"]},
+        [{"$set": {"is_active": {"$not": [{"$ifNull": ["$is_active", True]}]}}}],
+        projection={"_id": 0, "is_active": 1},
+        return_document=ReturnDocument.AFTER
+    )
     if not voice:
         raise HTTPException(status_code=404, detail="Voice message not found")
     
-    new_status = not voice.get("is_active", True)
-    await db.voice_messages.update_one(
-        {"id": voice_id},
-        {"$set": {"is_active": new_status}}
-    )
-    return {"message": "Status updated", "is_active": new_status}
+    return {"message": "Status updated", "is_active": voice["is_active"]}
 
 
 @router.delete("/{voice_id}")
 async def delete_voice_message(voice_id: str, current_user: dict = Depends(get_current_user)):
-    voice = await db.voice_messages.find_one({"id": voice_id, "user_id": current_user["id"]})
+    voice = await db.voice_messages.find_one_and_delete(
+        {"id": voice_id, "user_id": current_user["id"]},
+        projection={"_id": 0, "filename": 1}
+    )
     if not voice:
         raise HTTPException(status_code=404, detail="Voice message not found")
     
-    # Delete file
-    file_path = UPLOAD_DIR / voice["filename"]
-    if file_path.exists():
-        os.remove(file_path)
-    
-    await db.voice_messages.delete_one({"id": voice_id})
+    await remove_voice_files([voice["filename"]])
     return {"message": "Voice message deleted"}
+
+
+@router.post("/bulk-delete")
+async def bulk_delete_voice_messages(request: VoiceMessageBulkDelete, current_user: dict = Depends(get_current_user)):
+    query = {"id": {"$in": request.ids}, "user_id": current_user["id"]}
+    voices = await db.voice_messages.find(query, {"_id": 0, "filename": 1}).to_list(None)
+    result = await db.voice_messages.delete_many(query)
+    
+    await remove_voice_files([v["filename"] for v in voices])
+    return {"message": f"Deleted {result.deleted_count} voice messages", "deleted": result.deleted_count}
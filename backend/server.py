@@ -2,8 +2,13 @@
 TG Sender - Telegram Bot Manager API
 This file imports from the refactored modular structure
 """
+import sys
+
 # Import the app from main.py for backward compatibility with supervisor config
 from main import app
 
+# Alias this module to main so `server:app` and `main:app` resolve to one module object
+sys.modules[__name__] = sys.modules["main"]
+
 # Re-export for uvicorn
 __all__ = ['app']
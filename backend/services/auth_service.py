@@ -2,43 +2,114 @@
 Authentication service - JWT token handling and password hashing
 """
 from datetime import datetime, timezone, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import asyncio
+import functools
+import hashlib
+import time
+from cachetools import TLRUCache
+import bcrypt
+import jwt
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from config import db, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = 12
 security = HTTPBearer()
 
+# HMAC key bytes, encoded once rather than on every sign/verify
+_SECRET = SECRET_KEY.encode()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+# SHA-256 of a verified bearer token -> (user, exp). Entries live for at most
+# USER_CACHE_TTL seconds and never outlive the token's own expiry.
+USER_CACHE_TTL = 300
+_user_cache = TLRUCache(
+    maxsize=10_000,
+    ttu=lambda _key, value, now: min(now + USER_CACHE_TTL, value[1]),
+    timer=time.time
+)
+# Token key -> in-flight user lookup, so a burst of requests on a cold token shares one query
+_user_lookups = {}
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+def _token_key(token: str) -> bytes:
+    """Fixed-size cache key, so raw bearer tokens aren't kept in memory"""
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _lookup_done(key: bytes, lookup: asyncio.Future):
+    """Forget a finished lookup; retrieve its error in case every waiter was cancelled"""
+    _user_lookups.pop(key, None)
+    if not lookup.cancelled():
+        lookup.exception()
+
+
+def _check_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+def _hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+
+# bcrypt is deliberately slow and releases the GIL - run it on a worker thread
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.to_thread(_check_password, plain_password, hashed_password)
+
+
+async def get_password_hash(password: str) -> str:
+    return await asyncio.to_thread(_hash_password, password)
 
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt.encode(to_encode, _SECRET, algorithm=ALGORITHM)
+
+
+def cache_user(token: str, user: dict):
+    """Seed the cache for a token just issued at login/register, so the first authed call skips Mongo"""
+    expires = time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    _user_cache[_token_key(token)] = ({k: v for k, v in user.items() if k not in ("_id", "password_hash")}, expires)
+
+
+def invalidate_user_cache(token: str = None):
+    """Drop a cached token (or the whole cache when no token is given)"""
+    if token is None:
+        _user_cache.clear()
+    else:
+        _user_cache.pop(_token_key(token), None)
 
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
+    key = _token_key(token)
+    cached = _user_cache.get(key)
+    if cached is not None:
+        return cached[0]
+    
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, _SECRET, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
+    # Handlers only read identity fields; keep password hashes out of the cache
+    lookup = _user_lookups.get(key)
+    if lookup is None:
+        lookup = asyncio.ensure_future(db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0}))
+        _user_lookups[key] = lookup
+        lookup.add_done_callback(functools.partial(_lookup_done, key))
+    user = await asyncio.shield(lookup)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
+    
+    _user_cache[key] = (user, payload.get("exp", time.time()))
     return user
@@ -0,0 +1,51 @@
+"""
+Per-user response caches - list bodies keyed on a write version stored in Mongo,
+and short-lived analytics
+"""
+from typing import Awaitable, Callable
+
+from cachetools import TTLCache
+from fastapi import Request, Response
+
+from config import db
+
+# etag -> rendered JSON body
+_list_response_cache = TTLCache(maxsize=1000, ttl=300)
+
+# user_id -> AnalyticsResponse; dashboards poll it every few seconds
+analytics_cache = TTLCache(maxsize=1000, ttl=30)
+
+
+def invalidate_analytics(user_id: str):
+    """Drop a user's cached analytics after a write that changes its totals"""
+    analytics_cache.pop(user_id, None)
+
+
+async def bump_list_version(user_id: str, name: str):
+    """Invalidate a user's cached `name` list - call after the data write lands"""
+    await db.list_versions.update_one({"_id": user_id}, {"$inc": {name: 1}}, upsert=True)
+    invalidate_analytics(user_id)
+
+
+async def cached_list_response(
+    request: Request,
+    user_id: str,
+    name: str,
+    variant: str,
+    render: Callable[[], Awaitable[bytes]]
+) -> Response:
+    """Answer 304 when the client's ETag is current, else serve the body rendered for this version"""
+    versions = await db.list_versions.find_one({"_id": user_id}, {name: 1})
+    version = (versions or {}).get(name, 0)
+    etag = f'"{name}-{user_id}-{version}-{variant}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    body = _list_response_cache.get(etag)
+    if body is None:
+        # The version is read before the data, so a body is never older than its etag
+        body = await render()
+        _list_response_cache[etag] = body
+    return Response(body, media_type="application/json", headers=headers)
@@ -10,10 +10,15 @@ import asyncio
 import logging
 
 from config import db
+from services.cache_service import bump_list_version
 from services.telegram_service import send_message, send_voice_message
 
 logger = logging.getLogger(__name__)
 
+SPINTAX_PATTERN = re.compile(r'\{([^{}]+\|[^{}]+)\}')
+# Telegram API calls allowed in flight at once across all accounts of a campaign
+SEND_CONCURRENCY = 10
+
 
 async def get_available_accounts(user_id: str, account_categories: List[str] = None, account_ids: List[str] = None) -> List[dict]:
     """Get available accounts based on categories or IDs, respecting limits"""
@@ -35,19 +40,18 @@ async def get_available_accounts(user_id: str, account_categories: List[str] = N
     
     accounts = await db.telegram_accounts.find(account_query, {"_id": 0}).to_list(100)
     
-    # Reset counters if needed
+    # Reset counters if needed - the resets apply to the fetched docs too, so no re-fetch is needed
     now = datetime.now(timezone.utc)
-    for acc in accounts:
-        await reset_account_counters(acc, now)
-    
-    # Re-fetch to get updated counters
-    accounts = await db.telegram_accounts.find(account_query, {"_id": 0}).to_list(100)
+    reset = await asyncio.gather(*(reset_account_counters(acc, now) for acc in accounts))
+    if any(reset):
+        await bump_list_version(user_id, "accounts")
     return accounts
 
 
-async def reset_account_counters(account: dict, now: datetime):
-    """Reset hourly/daily counters if time has passed"""
+async def reset_account_counters(account: dict, now: datetime) -> bool:
+    """Reset hourly/daily counters if time has passed, returning whether anything changed"""
     updates = {}
+    now_iso = now.isoformat()
     
     last_hour_reset = account.get("last_hour_reset")
     if last_hour_reset:
@@ -55,10 +59,10 @@ async def reset_account_counters(account: dict, now: datetime):
             last_hour_dt = datetime.fromisoformat(last_hour_reset.replace('Z', '+00:00'))
             if (now - last_hour_dt) >= timedelta(hours=1):
                 updates["messages_sent_hour"] = 0
-                updates["last_hour_reset"] = now.isoformat()
+                updates["last_hour_reset"] = now_iso
         except:
             updates["messages_sent_hour"] = 0
-            updates["last_hour_reset"] = now.isoformat()
+            updates["last_hour_reset"] = now_iso
     
     last_day_reset = account.get("last_day_reset")
     if last_day_reset:
@@ -66,48 +70,26 @@ async def reset_account_counters(account: dict, now: datetime):
             last_day_dt = datetime.fromisoformat(last_day_reset.replace('Z', '+00:00'))
             if (now - last_day_dt) >= timedelta(days=1):
                 updates["messages_sent_today"] = 0
-                updates["last_day_reset"] = now.isoformat()
+                updates["last_day_reset"] = now_iso
         except:
             updates["messages_sent_today"] = 0
-            updates["last_day_reset"] = now.isoformat()
+            updates["last_day_reset"] = now_iso
     
     if updates:
         await db.telegram_accounts.update_one({"id": account["id"]}, {"$set": updates})
+        account.update(updates)
+    return bool(updates)
 
 
-def select_best_account(accounts: List[dict], account_msg_count: Dict[str, int], respect_limits: bool = True) -> dict:
-    """Select the best account for sending - least loaded and within limits"""
-    available = []
-    
-    for acc in accounts:
-        # Only use authorized accounts with session
-        if not acc.get("session_string"):
-            continue
-            
-        limits = acc.get("limits", {})
-        max_per_hour = limits.get("max_per_hour", 20)
-        max_per_day = limits.get("max_per_day", 100)
-        
-        current_hour = acc.get("messages_sent_hour", 0) + account_msg_count.get(acc["id"], 0)
-        current_day = acc.get("messages_sent_today", 0) + account_msg_count.get(acc["id"], 0)
-        
-        if respect_limits:
-            if current_hour >= max_per_hour or current_day >= max_per_day:
-                continue
-        
-        available.append({
-            "account": acc,
-            "load": current_hour,
-            "remaining_hour": max_per_hour - current_hour,
-            "remaining_day": max_per_day - current_day
-        })
-    
-    if not available:
-        return None
+def within_limits(account: dict, sent_this_run: int) -> bool:
+    """Whether the account can send another message under its hourly and daily limits"""
+    limits = account.get("limits", {})
+    max_per_hour = limits.get("max_per_hour", 20)
+    max_per_day = limits.get("max_per_day", 100)
     
-    # Sort by load (least loaded first), then by remaining capacity
-    available.sort(key=lambda x: (x["load"], -x["remaining_hour"]))
-    return available[0]["account"]
+    current_hour = account.get("messages_sent_hour", 0) + sent_this_run
+    current_day = account.get("messages_sent_today", 0) + sent_this_run
+    return current_hour < max_per_hour and current_day < max_per_day
 
 
 def process_template(template: str, contact: dict) -> str:
@@ -135,7 +117,7 @@ def process_template(template: str, contact: dict) -> str:
         options = match.group(1).split("|")
         return random.choice(options)
     
-    text = re.sub(r'\{([^{}]+\|[^{}]+)\}', replace_spintax, text)
+    text = SPINTAX_PATTERN.sub(replace_spintax, text)
     
     return text
 
@@ -150,18 +132,19 @@ async def execute_campaign(campaign: dict, user_id: str) -> Dict[str, Any]:
     elif campaign.get("tag_filter"):
         contact_query["tags"] = campaign["tag_filter"]
     
-    contacts = await db.contacts.find(contact_query, {"_id": 0}).to_list(500)
+    # Contacts and accounts don't depend on each other - fetch them together
+    contacts, accounts = await asyncio.gather(
+        db.contacts.find(contact_query, {"_id": 0}).to_list(500),
+        get_available_accounts(
+            user_id,
+            campaign.get("account_categories", []),
+            campaign.get("account_ids", [])
+        )
+    )
     
     if not contacts:
         return {"error": "No contacts found", "sent": 0, "delivered": 0, "failed": 0, "responses": 0, "accounts_used": 0, "by_category": {}}
     
-    # Get accounts (only active with session)
-    accounts = await get_available_accounts(
-        user_id,
-        campaign.get("account_categories", []),
-        campaign.get("account_ids", [])
-    )
-    
     # Filter only authorized accounts
     authorized_accounts = [acc for acc in accounts if acc.get("session_string")]
     
@@ -175,38 +158,28 @@ async def execute_campaign(campaign: dict, user_id: str) -> Dict[str, Any]:
     respect_limits = campaign.get("respect_limits", True)
     
     account_msg_count = {acc["id"]: 0 for acc in authorized_accounts}
-    skipped_due_to_limits = 0
+    banned_ids = set()
     errors = []
+    pending_contacts = iter(contacts)
+    send_slots = asyncio.Semaphore(SEND_CONCURRENCY)
     
-    for contact in contacts:
-        # Select best account
-        if use_rotation:
-            account = select_best_account(authorized_accounts, account_msg_count, respect_limits)
-        else:
-            # Use first available authorized account
-            for acc in authorized_accounts:
-                if acc.get("session_string"):
-                    account = acc
-                    break
-            else:
-                account = None
-        
-        if not account:
-            skipped_due_to_limits += 1
-            continue
+    async def send_to(account: dict, contact: dict) -> int:
+        """Send one message and record it, returning the anti-flood delay the account needs next"""
+        nonlocal messages_sent, messages_delivered, messages_failed
         
         # Process message template
         message_text = process_template(campaign["message_template"], contact)
         
         # REAL Telegram sending via Telethon
-        result = await send_message(
-            account_id=account["id"],
-            phone=account["phone"],
-            session_string=account["session_string"],
-            recipient_phone=contact["phone"],
-            message=message_text,
-            proxy=account.get("proxy")
-        )
+        async with send_slots:
+            result = await send_message(
+                account_id=account["id"],
+                phone=account["phone"],
+                session_string=account["session_string"],
+                recipient_phone=contact["phone"],
+                message=message_text,
+                proxy=account.get("proxy")
+            )
         
         delivered = result.get("status") == "sent"
         
@@ -218,11 +191,8 @@ async def execute_campaign(campaign: dict, user_id: str) -> Dict[str, Any]:
         
         logger.info(f"Message to {contact['phone']}: {result['status']}. Waiting {delay}s...")
         
-        # Create dialog entry
-        dialog = await db.dialogs.find_one({
-            "contact_id": contact["id"],
-            "user_id": user_id
-        })
+        # One timestamp for every write this message makes
+        sent_at = datetime.now(timezone.utc)
         
         message_entry = {
             "id": str(uuid.uuid4()),
@@ -234,77 +204,94 @@ async def execute_campaign(campaign: dict, user_id: str) -> Dict[str, Any]:
             "account_id": account["id"],
             "account_phone": account["phone"],
             "account_category": account.get("price_category", "low"),
-            "sent_at": datetime.now(timezone.utc).isoformat()
+            "sent_at": sent_at
         }
         
-        if dialog:
-            await db.dialogs.update_one(
-                {"id": dialog["id"]},
-                {
-                    "$push": {"messages": message_entry},
-                    "$set": {"last_message_at": datetime.now(timezone.utc).isoformat()}
+        # Append to the contact's dialog, creating it on first message
+        writes = [db.dialogs.update_one(
+            {"contact_id": contact["id"], "user_id": user_id},
+            {
+                "$push": {"messages": message_entry},
+                "$set": {"last_message_at": sent_at},
+                "$setOnInsert": {
+                    "id": str(uuid.uuid4()),
+                    "contact_phone": contact["phone"],
+                    "contact_name": contact.get("name"),
+                    "account_id": account["id"],
+                    "account_phone": account["phone"],
+                    "has_response": False,
+                    "created_at": sent_at
                 }
-            )
-        else:
-            dialog_doc = {
-                "id": str(uuid.uuid4()),
-                "user_id": user_id,
-                "contact_id": contact["id"],
-                "contact_phone": contact["phone"],
-                "contact_name": contact.get("name"),
-                "account_id": account["id"],
-                "account_phone": account["phone"],
-                "messages": [message_entry],
-                "last_message_at": datetime.now(timezone.utc).isoformat(),
-                "has_response": False,
-                "created_at": datetime.now(timezone.utc).isoformat()
-            }
-            await db.dialogs.insert_one(dialog_doc)
+            },
+            upsert=True
+        )]
         
         messages_sent += 1
         account_msg_count[account["id"]] += 1
+        account_update = {"$inc": {"total_messages_sent": 1, "messages_sent_today": 1, "messages_sent_hour": 1}}
         
         if delivered:
             messages_delivered += 1
-            await db.contacts.update_one(
+            account_update["$inc"]["total_messages_delivered"] = 1
+            account_update["$set"] = {"last_active": sent_at.isoformat()}
+            writes.append(db.contacts.update_one(
                 {"id": contact["id"]},
-                {"$set": {"status": "messaged", "last_contacted": datetime.now(timezone.utc).isoformat()}}
-            )
-            await db.telegram_accounts.update_one(
-                {"id": account["id"]},
-                {
-                    "$inc": {"total_messages_sent": 1, "total_messages_delivered": 1, "messages_sent_today": 1, "messages_sent_hour": 1},
-                    "$set": {"last_active": datetime.now(timezone.utc).isoformat()}
-                }
-            )
+                {"$set": {"status": "messaged", "last_contacted": sent_at}}
+            ))
         else:
             messages_failed += 1
             errors.append({"contact": contact["phone"], "error": result.get("message", "Unknown error")})
-            await db.telegram_accounts.update_one(
-                {"id": account["id"]},
-                {"$inc": {"total_messages_sent": 1, "messages_sent_today": 1, "messages_sent_hour": 1}}
-            )
             
             # Check if account got banned
             if "banned" in result.get("message", "").lower():
-                await db.telegram_accounts.update_one(
-                    {"id": account["id"]},
-                    {"$set": {"status": "banned"}}
-                )
-                # Remove from available accounts
-                authorized_accounts = [a for a in authorized_accounts if a["id"] != account["id"]]
+                account_update["$set"] = {"status": "banned"}
+                banned_ids.add(account["id"])
         
-        # Wait between messages
-        await asyncio.sleep(delay)
+        writes.append(db.telegram_accounts.update_one({"id": account["id"]}, account_update))
+        # The dialog, contact and account writes are independent - issue them together
+        await asyncio.gather(*writes)
+        return delay
+    
+    async def run_lane(lane_accounts: List[dict]):
+        """Work through the shared contact list, pacing each account by its own delay"""
+        for account in lane_accounts:
+            while account["id"] not in banned_ids:
+                if use_rotation and respect_limits and not within_limits(account, account_msg_count[account["id"]]):
+                    break
+                contact = next(pending_contacts, None)
+                if contact is None:
+                    return
+                delay = await send_to(account, contact)
+                # Wait between messages
+                await asyncio.sleep(delay)
+    
+    # With rotation every account sends in parallel, each waiting out its own delay;
+    # without it one account is used until it gets banned, then the next
+    lanes = [[acc] for acc in authorized_accounts] if use_rotation else [authorized_accounts]
+    lane_tasks = [asyncio.create_task(run_lane(lane)) for lane in lanes]
+    try:
+        await asyncio.gather(*lane_tasks)
+    except BaseException:
+        # One failed lane (or a cancelled request) stops the whole campaign - no lane keeps sending unawaited
+        for task in lane_tasks:
+            task.cancel()
+        await asyncio.gather(*lane_tasks, return_exceptions=True)
+        raise
+    finally:
+        # Account counters and ban statuses changed throughout - invalidate cached account lists once
+        await bump_list_version(user_id, "accounts")
+    
+    skipped_due_to_limits = sum(1 for _ in pending_contacts)
     
-    # Get category distribution
+    # Get category distribution in one pass over the accounts that are still usable
     category_stats = {}
-    for acc_id, count in account_msg_count.items():
-        if count > 0:
-            acc = next((a for a in authorized_accounts if a["id"] == acc_id), None)
-            if acc:
-                cat = acc.get("price_category", "low")
-                category_stats[cat] = category_stats.get(cat, 0) + count
+    accounts_used = 0
+    for acc in authorized_accounts:
+        count = account_msg_count[acc["id"]]
+        if count > 0 and acc["id"] not in banned_ids:
+            accounts_used += 1
+            cat = acc.get("price_category", "low")
+            category_stats[cat] = category_stats.get(cat, 0) + count
     
     return {
         "sent": messages_sent,
@@ -312,7 +299,7 @@ async def execute_campaign(campaign: dict, user_id: str) -> Dict[str, Any]:
         "failed": messages_failed,
         "responses": 0,  # Will be updated as responses come in
         "skipped_due_to_limits": skipped_due_to_limits,
-        "accounts_used": len([a for a in authorized_accounts if account_msg_count.get(a["id"], 0) > 0]),
+        "accounts_used": accounts_used,
         "by_category": category_stats,
         "errors": errors[:10] if errors else []  # First 10 errors
     }
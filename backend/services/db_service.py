@@ -0,0 +1,190 @@
+"""
+Database helpers shared across routers and services
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+import uuid
+from typing import Dict, List, Tuple
+
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from config import db
+
+logger = logging.getLogger(__name__)
+
+# Bulk imports and re-creatable metadata only need the primary's ack, not the w:majority default of replica sets
+PRIMARY_ACK_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+# Concurrent insert_many calls per import - past ~8 the server, not the pool, is the bottleneck
+BULK_INSERT_CONCURRENCY = 8
+
+FOLLOWUP_RETENTION_SECONDS = 7 * 24 * 3600
+
+# collection -> [(keys, options)]
+INDEXES = {
+    "users": [
+        ([("email", 1)], {"unique": True}),
+        ([("id", 1)], {"unique": True}),
+    ],
+    "telegram_accounts": [
+        ([("id", 1)], {"unique": True}),
+        ([("user_id", 1), ("value_usdt", 1)], {}),
+        ([("user_id", 1), ("status", 1)], {}),
+        ([("user_id", 1), ("phone", 1)], {"unique": True}),
+    ],
+    "contacts": [
+        ([("id", 1)], {"unique": True}),
+        ([("user_id", 1), ("phone", 1)], {"unique": True}),
+        ([("user_id", 1), ("status", 1)], {}),
+        ([("user_id", 1), ("created_at", 1), ("id", 1)], {}),
+        # Also serves campaign targeting, which filters pending contacts by tag
+        ([("user_id", 1), ("tags", 1), ("status", 1)], {}),
+    ],
+    "campaigns": [
+        ([("id", 1)], {"unique": True}),
+        ([("user_id", 1), ("status", 1)], {}),
+    ],
+    "dialogs": [
+        ([("id", 1)], {"unique": True}),
+        # id breaks last_message_at ties so list pages are stable
+        ([("user_id", 1), ("last_message_at", -1), ("id", -1)], {}),
+        ([("user_id", 1), ("has_response", 1), ("last_message_at", -1), ("id", -1)], {}),
+        ([("contact_id", 1), ("user_id", 1)], {}),
+    ],
+    "templates": [
+        ([("id", 1)], {"unique": True}),
+        ([("user_id", 1)], {}),
+    ],
+    "voice_messages": [
+        ([("user_id", 1), ("id", 1)], {"unique": True}),
+        ([("user_id", 1), ("is_active", 1)], {}),
+        ([("id", 1)], {"unique": True}),
+    ],
+    "followup_queue": [
+        ([("id", 1)], {"unique": True}),
+        ([("user_id", 1), ("scheduled_at", 1), ("id", 1)], {}),
+        ([("user_id", 1), ("status", 1), ("scheduled_at", 1), ("id", 1)], {}),
+        ([("contact_id", 1), ("status", 1)], {}),
+        # Finished items are purged server-side a week after completion. Only sent, failed
+        # and cancelled items get completed_at; $exists works on servers older than 6.0, unlike $in
+        ([("completed_at", 1)], {
+            "expireAfterSeconds": FOLLOWUP_RETENTION_SECONDS,
+            "partialFilterExpression": {"completed_at": {"$exists": True}}
+        }),
+    ],
+}
+
+
+async def ensure_indexes():
+    """Create the indexes hot queries rely on (no-op if they already exist)"""
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await db[collection].create_index(keys, **options)
+            except OperationFailure as e:
+                # Usually existing duplicates blocking a unique index - keep serving
+                logger.warning(f"Could not create index {keys} on {collection}: {e}")
+
+
+async def aggregate_first(collection, pipeline: list) -> dict:
+    """Run an aggregation that yields a single document ($facet / $group)"""
+    cursor = await collection.aggregate(pipeline)
+    docs = await cursor.to_list(1)
+    return docs[0] if docs else {}
+
+
+# Timestamps that used to be stored as ISO strings and are now BSON dates
+DATE_FIELDS = {
+    "contacts": ["created_at", "last_contacted", "read_at", "voice_sent_at"],
+    "dialogs": ["created_at", "last_message_at"],
+    "followup_queue": ["read_at", "scheduled_at", "created_at", "sent_at", "failed_at", "cancelled_at"],
+    "templates": ["created_at", "updated_at"],
+}
+
+
+def _to_date(expr: str) -> dict:
+    # Unparseable values are left as they are rather than failing the whole update
+    return {"$dateFromString": {"dateString": expr, "onError": expr}}
+
+
+async def migrate_string_timestamps():
+    """One-off conversion of legacy ISO-string timestamps to BSON dates"""
+    if await db.migrations.find_one({"_id": "bson_timestamps"}):
+        return
+    
+    for collection, fields in DATE_FIELDS.items():
+        for field in fields:
+            await db[collection].update_many(
+                {field: {"$type": "string"}},
+                [{"$set": {field: _to_date(f"${field}")}}]
+            )
+    
+    await db.dialogs.update_many(
+        {"messages.sent_at": {"$type": "string"}},
+        [{"$set": {"messages": {"$map": {
+            "input": "$messages",
+            "as": "m",
+            "in": {"$cond": [
+                {"$eq": [{"$type": "$$m.sent_at"}, "string"]},
+                {"$mergeObjects": ["$$m", {"sent_at": _to_date("$$m.sent_at")}]},
+                "$$m"
+            ]}
+        }}}}]
+    )
+    
+    await db.migrations.insert_one({"_id": "bson_timestamps", "applied_at": datetime.now(timezone.utc)})
+    logger.info("Converted legacy string timestamps to BSON dates")
+
+
+async def insert_batches(collection, docs: list, batch_size: int = 1000) -> Tuple[int, List[dict]]:
+    """Insert docs as unordered batches over several pooled connections.
+    
+    Returns how many landed and the docs a unique index rejected as duplicates.
+    Any other write error is re-raised once every batch has finished.
+    """
+    semaphore = asyncio.Semaphore(BULK_INSERT_CONCURRENCY)
+    
+    async def insert(batch: list) -> Tuple[int, List[dict]]:
+        async with semaphore:
+            try:
+                result = await collection.insert_many(batch, ordered=False)
+                return len(result.inserted_ids), []
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                if e.details.get("writeConcernErrors") or any(err.get("code") != 11000 for err in write_errors):
+                    raise
+                return e.details.get("nInserted", 0), [batch[err["index"]] for err in write_errors]
+    
+    # Let every batch settle before surfacing a failure so none is left writing unawaited
+    results = await asyncio.gather(
+        *(insert(docs[i:i + batch_size]) for i in range(0, len(docs), batch_size)),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return sum(n for n, _ in results), [doc for _, dups in results for doc in dups]
+
+
+def facet_count(facet: dict, key: str) -> int:
+    """Read a {"$count": "n"} sub-pipeline result out of a $facet document"""
+    bucket = facet.get(key) or []
+    return bucket[0]["n"] if bucket else 0
+
+
+async def count_by_status(collection, match: dict) -> Dict[str, int]:
+    """Matching document counts per status value, in one pass over the (user_id, status) index"""
+    cursor = await collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$status", "n": {"$sum": 1}}}
+    ])
+    return {row["_id"]: row["n"] async for row in cursor}
+
+
+def new_ids(count: int) -> List[str]:
+    """Generate `count` uuid4 strings from a single urandom read"""
+    raw = os.urandom(16 * count)
+    return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, len(raw), 16)]
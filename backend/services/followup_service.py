@@ -1,13 +1,16 @@
 """
 Follow-up service - handles "read but not replied" logic with REAL Telegram sending
 """
+from collections import Counter
 from datetime import datetime, timezone, timedelta
 from typing import Dict, Any
 import uuid
 import asyncio
 import logging
+from pymongo import UpdateOne
 
 from config import db, UPLOAD_DIR
+from services.db_service import count_by_status
 from services.telegram_service import send_voice_message
 
 logger = logging.getLogger(__name__)
@@ -30,20 +33,17 @@ async def add_to_followup_queue(user_id: str, voice_message_id: str) -> Dict[str
     
     read_contacts = await get_read_not_replied_contacts(user_id)
     
-    added = 0
-    already_in_queue = 0
+    now = datetime.now(timezone.utc)
+    scheduled_at = now + timedelta(minutes=voice["delay_minutes"])
     
-    for contact in read_contacts:
-        # Check if already in pending queue
-        existing = await db.followup_queue.find_one({
-            "contact_id": contact["id"],
-            "status": "pending"
-        })
-        if existing:
-            already_in_queue += 1
-            continue
-        
-        queue_doc = {
+    # One lookup for every contact that already has a pending follow-up
+    queued_ids = set(await db.followup_queue.distinct("contact_id", {
+        "contact_id": {"$in": [contact["id"] for contact in read_contacts]},
+        "status": "pending"
+    }))
+    
+    queue_docs = [
+        {
             "id": str(uuid.uuid4()),
             "user_id": user_id,
             "contact_id": contact["id"],
@@ -52,12 +52,16 @@ async def add_to_followup_queue(user_id: str, voice_message_id: str) -> Dict[str
             "voice_message_id": voice_message_id,
             "voice_message_name": voice["name"],
             "status": "pending",
-            "read_at": contact.get("read_at", datetime.now(timezone.utc).isoformat()),
-            "scheduled_at": (datetime.now(timezone.utc) + timedelta(minutes=voice["delay_minutes"])).isoformat(),
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "read_at": contact.get("read_at", now),
+            "scheduled_at": scheduled_at,
+            "created_at": now
         }
-        await db.followup_queue.insert_one(queue_doc)
-        added += 1
+        for contact in read_contacts if contact["id"] not in queued_ids
+    ]
+    if queue_docs:
+        await db.followup_queue.insert_many(queue_docs, ordered=False)
+    added = len(queue_docs)
+    already_in_queue = len(read_contacts) - added
     
     return {
         "added": added,
@@ -103,77 +107,87 @@ async def process_followup_queue(user_id: str) -> Dict[str, Any]:
     failed = 0
     errors = []
     
-    for item in pending_items:
-        # Get voice message file
-        voice = await db.voice_messages.find_one({"id": item.get("voice_message_id")})
-        if not voice:
-            await db.followup_queue.update_one(
-                {"id": item["id"]},
-                {"$set": {"status": "failed", "error": "Voice message not found", "failed_at": now.isoformat()}}
-            )
-            failed += 1
-            continue
-        
-        voice_file_path = str(UPLOAD_DIR / voice["filename"])
-        
-        # REAL Telegram voice message sending
-        result = await send_voice_message(
-            account_id=account["id"],
-            phone=account["phone"],
-            session_string=account["session_string"],
-            recipient_phone=item["contact_phone"],
-            voice_file_path=voice_file_path,
-            proxy=account.get("proxy")
+    # Fetch every voice message the queue refers to up front instead of once per item
+    voices = {
+        v["id"]: v async for v in db.voice_messages.find(
+            {"id": {"$in": list({item.get("voice_message_id") for item in pending_items})}, "user_id": user_id},
+            {"_id": 0, "id": 1, "filename": 1}
         )
-        
-        if result.get("status") == "sent":
-            await db.followup_queue.update_one(
-                {"id": item["id"]},
-                {"$set": {"status": "sent", "sent_at": now.isoformat()}}
-            )
+    }
+    
+    # Sent counts per voice message, written once when the run ends
+    voice_sends = Counter()
+    try:
+        for item in pending_items:
+            # Get voice message file
+            voice = voices.get(item.get("voice_message_id"))
+            if not voice:
+                await db.followup_queue.update_one(
+                    {"id": item["id"]},
+                    {"$set": {"status": "failed", "error": "Voice message not found", "failed_at": now, "completed_at": now}}
+                )
+                failed += 1
+                continue
             
-            # Update contact status
-            await db.contacts.update_one(
-                {"id": item["contact_id"]},
-                {"$set": {"status": "voice_sent", "voice_sent_at": now.isoformat()}}
-            )
+            voice_file_path = str(UPLOAD_DIR / voice["filename"])
             
-            # Update voice message counter
-            await db.voice_messages.update_one(
-                {"id": item["voice_message_id"]},
-                {"$inc": {"sent_count": 1}}
+            # REAL Telegram voice message sending
+            result = await send_voice_message(
+                account_id=account["id"],
+                phone=account["phone"],
+                session_string=account["session_string"],
+                recipient_phone=item["contact_phone"],
+                voice_file_path=voice_file_path,
+                proxy=account.get("proxy")
             )
             
-            # Add to dialog
-            dialog = await db.dialogs.find_one({"contact_id": item["contact_id"]})
-            if dialog:
-                await db.dialogs.update_one(
-                    {"id": dialog["id"]},
-                    {"$push": {"messages": {
-                        "id": str(uuid.uuid4()),
-                        "direction": "outgoing",
-                        "type": "voice",
-                        "text": f"🎤 Голосовое сообщение: {item.get('voice_message_name', 'Без названия')}",
-                        "status": "delivered",
-                        "telegram_message_id": result.get("message_id"),
-                        "sent_at": now.isoformat()
-                    }}}
+            if result.get("status") == "sent":
+                # Queue item, contact and dialog are independent - write them together
+                await asyncio.gather(
+                    db.followup_queue.update_one(
+                        {"id": item["id"]},
+                        {"$set": {"status": "sent", "sent_at": now, "completed_at": now}}
+                    ),
+                    db.contacts.update_one(
+                        {"id": item["contact_id"]},
+                        {"$set": {"status": "voice_sent", "voice_sent_at": now}}
+                    ),
+                    # Add to the contact's dialog, if there is one
+                    db.dialogs.update_one(
+                        {"contact_id": item["contact_id"], "user_id": user_id},
+                        {"$push": {"messages": {
+                            "id": str(uuid.uuid4()),
+                            "direction": "outgoing",
+                            "type": "voice",
+                            "text": f"🎤 Голосовое сообщение: {item.get('voice_message_name', 'Без названия')}",
+                            "status": "delivered",
+                            "telegram_message_id": result.get("message_id"),
+                            "sent_at": now
+                        }}}
+                    )
                 )
-            
-            sent += 1
-            logger.info(f"Voice sent to {item['contact_phone']}")
-            
-            # Delay between sends
-            await asyncio.sleep(30)
-        else:
-            error_msg = result.get("message", "Unknown error")
-            await db.followup_queue.update_one(
-                {"id": item["id"]},
-                {"$set": {"status": "failed", "error": error_msg, "failed_at": now.isoformat()}}
-            )
-            errors.append({"contact": item["contact_phone"], "error": error_msg})
-            failed += 1
-            logger.error(f"Voice failed to {item['contact_phone']}: {error_msg}")
+                voice_sends[item["voice_message_id"]] += 1
+                
+                sent += 1
+                logger.info(f"Voice sent to {item['contact_phone']}")
+                
+                # Delay between sends
+                await asyncio.sleep(30)
+            else:
+                error_msg = result.get("message", "Unknown error")
+                await db.followup_queue.update_one(
+                    {"id": item["id"]},
+                    {"$set": {"status": "failed", "error": error_msg, "failed_at": now, "completed_at": now}}
+                )
+                errors.append({"contact": item["contact_phone"], "error": error_msg})
+                failed += 1
+                logger.error(f"Voice failed to {item['contact_phone']}: {error_msg}")
+    finally:
+        if voice_sends:
+            await db.voice_messages.bulk_write([
+                UpdateOne({"id": voice_id, "user_id": user_id}, {"$inc": {"sent_count": count}})
+                for voice_id, count in voice_sends.items()
+            ], ordered=False)
     
     return {
         "processed": len(pending_items),
@@ -185,12 +199,15 @@ async def process_followup_queue(user_id: str) -> Dict[str, Any]:
 
 async def get_followup_stats(user_id: str) -> Dict[str, Any]:
     """Get statistics about follow-up queue"""
-    pending = await db.followup_queue.count_documents({"user_id": user_id, "status": "pending"})
-    sent = await db.followup_queue.count_documents({"user_id": user_id, "status": "sent"})
-    failed = await db.followup_queue.count_documents({"user_id": user_id, "status": "failed"})
-    cancelled = await db.followup_queue.count_documents({"user_id": user_id, "status": "cancelled"})
+    queue_counts, read_contacts = await asyncio.gather(
+        count_by_status(db.followup_queue, {"user_id": user_id}),
+        db.contacts.count_documents({"user_id": user_id, "status": "read"})
+    )
     
-    read_contacts = await db.contacts.count_documents({"user_id": user_id, "status": "read"})
+    pending = queue_counts.get("pending", 0)
+    sent = queue_counts.get("sent", 0)
+    failed = queue_counts.get("failed", 0)
+    cancelled = queue_counts.get("cancelled", 0)
     
     return {
         "pending": pending,
@@ -0,0 +1,34 @@
+"""
+Import file parsing helpers shared by the account and contact importers
+"""
+from typing import Optional
+import csv
+import math
+
+from python_calamine import CalamineWorkbook
+
+
+def iter_csv_rows(stream):
+    """Yield CSV rows as dicts, leaving out empty cells"""
+    for row in csv.DictReader(stream):
+        yield {k: v for k, v in row.items() if k and v}
+
+
+def iter_excel_rows(stream):
+    """Yield rows of the first sheet of an .xlsx/.xls file as dicts keyed by the header row, leaving out empty cells"""
+    rows = CalamineWorkbook.from_filelike(stream).get_sheet_by_index(0).iter_rows()
+    headers = next(rows, None) or ()
+    for row in rows:
+        yield {k: v for k, v in zip(headers, row) if k and v is not None and v != ""}
+
+
+def normalize_phone(value) -> Optional[str]:
+    """Strip a phone cell, returning None when it is missing or blank"""
+    # Empty numeric spreadsheet cells come through as NaN
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    # Spreadsheets store numeric phones as floats - drop the trailing .0
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    phone = (value if isinstance(value, str) else str(value)).strip()
+    return phone or None
@@ -23,6 +23,7 @@ from telethon.errors import (
 from telethon.tl.types import User, InputPeerUser
 
 from config import db, ROOT_DIR
+from services.cache_service import bump_list_version
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +42,13 @@ _active_clients: Dict[str, TelegramClient] = {}
 _pending_auths: Dict[str, Dict[str, Any]] = {}
 
 
+async def update_stored_account(account_id: str, update: dict):
+    """Update an account document and invalidate its owner's cached account lists, if it still exists"""
+    account = await db.telegram_accounts.find_one_and_update({"id": account_id}, update, projection={"_id": 0, "user_id": 1})
+    if account:
+        await bump_list_version(account["user_id"], "accounts")
+
+
 def generate_fingerprint() -> Dict[str, Any]:
     """Generate random device fingerprint for Telegram client"""
     
@@ -297,6 +305,7 @@ async def verify_code_new(
             "delay_max": 90
         }
         proxy_data = proxy or {"enabled": False, "type": "socks5", "host": "", "port": 0}
+        now = datetime.now(timezone.utc).isoformat()
         
         account_doc = {
             "id": account_id,
@@ -316,13 +325,14 @@ async def verify_code_new(
             "messages_sent_hour": 0,
             "total_messages_sent": 0,
             "total_messages_delivered": 0,
-            "last_hour_reset": datetime.now(timezone.utc).isoformat(),
-            "last_day_reset": datetime.now(timezone.utc).isoformat(),
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "last_active": datetime.now(timezone.utc).isoformat()
+            "last_hour_reset": now,
+            "last_day_reset": now,
+            "created_at": now,
+            "last_active": now
         }
         
         await db.telegram_accounts.insert_one(account_doc)
+        await bump_list_version(user_id, "accounts")
         
         # Update client cache with real account_id
         if temp_id in _active_clients:
@@ -389,6 +399,7 @@ async def verify_2fa_new(
             "delay_max": 90
         }
         proxy_data = proxy or {"enabled": False, "type": "socks5", "host": "", "port": 0}
+        now = datetime.now(timezone.utc).isoformat()
         
         account_doc = {
             "id": account_id,
@@ -408,13 +419,14 @@ async def verify_2fa_new(
             "messages_sent_hour": 0,
             "total_messages_sent": 0,
             "total_messages_delivered": 0,
-            "last_hour_reset": datetime.now(timezone.utc).isoformat(),
-            "last_day_reset": datetime.now(timezone.utc).isoformat(),
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "last_active": datetime.now(timezone.utc).isoformat()
+            "last_hour_reset": now,
+            "last_day_reset": now,
+            "created_at": now,
+            "last_active": now
         }
         
         await db.telegram_accounts.insert_one(account_doc)
+        await bump_list_version(user_id, "accounts")
         
         # Update client cache
         if temp_id in _active_clients:
@@ -457,8 +469,8 @@ async def start_authorization(account_id: str, phone: str, proxy: dict = None) -
             me = await client.get_me()
             session_string = client.session.save()
             
-            await db.telegram_accounts.update_one(
-                {"id": account_id},
+            await update_stored_account(
+                account_id,
                 {"$set": {
                     "session_string": session_string,
                     "status": "active",
@@ -523,8 +535,8 @@ async def verify_code(account_id: str, phone: str, code: str, phone_code_hash: s
         me = await client.get_me()
         session_string = client.session.save()
         
-        await db.telegram_accounts.update_one(
-            {"id": account_id},
+        await update_stored_account(
+            account_id,
             {"$set": {
                 "session_string": session_string,
                 "status": "active",
@@ -564,8 +576,8 @@ async def verify_2fa(account_id: str, phone: str, password: str, proxy: dict = N
         me = await client.get_me()
         session_string = client.session.save()
         
-        await db.telegram_accounts.update_one(
-            {"id": account_id},
+        await update_stored_account(
+            account_id,
             {"$set": {
                 "session_string": session_string,
                 "status": "active",
@@ -613,15 +625,15 @@ async def send_message(account_id: str, phone: str, session_string: str,
             return {"status": "error", "message": "User not found on Telegram"}
             
     except UserDeactivatedBanError:
-        await db.telegram_accounts.update_one(
-            {"id": account_id},
+        await update_stored_account(
+            account_id,
             {"$set": {"status": "banned"}}
         )
         return {"status": "error", "message": "Account is banned"}
         
     except AuthKeyUnregisteredError:
-        await db.telegram_accounts.update_one(
-            {"id": account_id},
+        await update_stored_account(
+            account_id,
             {"$set": {"status": "session_expired", "session_string": None}}
         )
         return {"status": "error", "message": "Session expired. Re-authorization required"}
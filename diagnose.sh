@@ -20,7 +20,7 @@ fi
 echo ""
 echo "=== 3. Проверка зависимостей Python ==="
 cd backend
-pip list | grep -E "(fastapi|motor|telethon|pydantic)"
+pip list | grep -E "(fastapi|pymongo|telethon|pydantic)"
 
 echo ""
 echo "=== 4. Тест API ==="
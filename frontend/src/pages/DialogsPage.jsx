@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { Card, CardContent } from '../components/ui/card';
 import { Button } from '../components/ui/button';
@@ -35,6 +35,8 @@ export default function DialogsPage() {
   const [filter, setFilter] = useState('all');
   const [replyText, setReplyText] = useState('');
   const [sending, setSending] = useState(false);
+  // Id of the dialog on screen, so a slow detail response can't replace a newer selection
+  const selectedIdRef = useRef(null);
 
   useEffect(() => {
     fetchDialogs();
@@ -57,10 +59,24 @@ export default function DialogsPage() {
     }
   };
 
-  const handleSelectDialog = async (dialog) => {
+  const showDialog = (dialog) => {
+    selectedIdRef.current = dialog ? dialog.id : null;
     setSelectedDialog(dialog);
   };
 
+  const handleSelectDialog = async (dialog) => {
+    showDialog(dialog);
+    // The list only carries the latest message - load the full history
+    try {
+      const response = await axios.get(`${API}/dialogs/${dialog.id}`);
+      if (response.data.id === selectedIdRef.current) {
+        setSelectedDialog(response.data);
+      }
+    } catch (error) {
+      toast.error('Ошибка загрузки диалога');
+    }
+  };
+
   const handleSendReply = async () => {
     if (!replyText.trim() || !selectedDialog) return;
     
@@ -74,7 +90,9 @@ export default function DialogsPage() {
       
       // Refresh dialog
       const response = await axios.get(`${API}/dialogs/${selectedDialog.id}`);
-      setSelectedDialog(response.data);
+      if (response.data.id === selectedIdRef.current) {
+        setSelectedDialog(response.data);
+      }
       fetchDialogs();
     } catch (error) {
       toast.error('Ошибка отправки');
@@ -195,7 +213,7 @@ export default function DialogsPage() {
                     variant="ghost"
                     size="icon"
                     className="lg:hidden"
-                    onClick={() => setSelectedDialog(null)}
+                    onClick={() => showDialog(null)}
                   >
                     <ArrowLeft className="w-5 h-5" />
                   </Button>
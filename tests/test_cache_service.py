@@ -0,0 +1,108 @@
+"""
+Response cache tests
+Tests for: list ETags, 304 revalidation, invalidation on writes
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+from starlette.requests import Request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+# The Mongo client only connects on first use, so importing the services needs no server
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:1')
+os.environ.setdefault('DB_NAME', 'test_database')
+
+from services import cache_service  # noqa: E402
+
+USER_ID = "user-1"
+
+
+class FakeListVersions:
+    """The two list_versions operations cache_service uses, kept in a dict"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"]})
+        for field, amount in update["$inc"].items():
+            doc[field] = doc.get(field, 0) + amount
+
+
+class FakeDb:
+    def __init__(self):
+        self.list_versions = FakeListVersions()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDb()
+    monkeypatch.setattr(cache_service, "db", db)
+    monkeypatch.setattr(cache_service, "_list_response_cache", {})
+    return db
+
+
+def make_request(etag=None) -> Request:
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/api/accounts", "headers": headers})
+
+
+def list_response(etag=None, renders=None):
+    """GET the accounts list through cached_list_response, counting renders"""
+    async def render() -> bytes:
+        if renders is not None:
+            renders.append(1)
+        return b'[]'
+
+    return asyncio.run(cache_service.cached_list_response(make_request(etag), USER_ID, "accounts", "all", render))
+
+
+class TestCachedListResponse:
+    """ETag revalidation for cached list bodies"""
+
+    def test_first_get_renders_with_etag(self, fake_db):
+        response = list_response()
+        assert response.status_code == 200
+        assert response.body == b'[]'
+        assert response.headers["etag"]
+        assert response.headers["cache-control"] == "no-cache"
+
+    def test_matching_if_none_match_is_304(self, fake_db):
+        renders = []
+        etag = list_response(renders=renders).headers["etag"]
+
+        response = list_response(etag, renders)
+        assert response.status_code == 304
+        assert response.body == b''
+        assert response.headers["etag"] == etag
+        assert len(renders) == 1
+
+    def test_repeat_get_reuses_rendered_body(self, fake_db):
+        renders = []
+        list_response(renders=renders)
+        list_response(renders=renders)
+        assert len(renders) == 1
+
+    def test_write_changes_etag(self, fake_db):
+        """Create/update routes bump the list version, so the old ETag no longer matches"""
+        renders = []
+        etag = list_response(renders=renders).headers["etag"]
+
+        asyncio.run(cache_service.bump_list_version(USER_ID, "accounts"))
+
+        response = list_response(etag, renders)
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert len(renders) == 2
+
+    def test_other_list_write_keeps_etag(self, fake_db):
+        etag = list_response().headers["etag"]
+
+        asyncio.run(cache_service.bump_list_version(USER_ID, "campaigns"))
+
+        assert list_response(etag).status_code == 304
@@ -0,0 +1,36 @@
+"""
+Database helper tests
+Tests for: bulk id generation
+"""
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+# The Mongo client only connects on first use, so importing the services needs no server
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:1')
+os.environ.setdefault('DB_NAME', 'test_database')
+
+from services.db_service import new_ids  # noqa: E402
+
+
+class TestNewIds:
+    """new_ids count, format and uniqueness"""
+
+    def test_returns_requested_count(self):
+        assert len(new_ids(5)) == 5
+        assert new_ids(0) == []
+
+    def test_ids_are_canonical_uuid4_strings(self):
+        for value in new_ids(100):
+            parsed = uuid.UUID(value)
+            assert parsed.version == 4
+            assert parsed.variant == uuid.RFC_4122
+            assert str(parsed) == value
+
+    def test_ids_are_unique(self):
+        ids = new_ids(10000)
+        assert len(set(ids)) == len(ids)
+
+    def test_separate_calls_do_not_repeat(self):
+        assert not set(new_ids(1000)) & set(new_ids(1000))
@@ -0,0 +1,35 @@
+"""
+Import parsing helper tests
+Tests for: phone normalization of CSV/JSON/spreadsheet cells
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+pytest.importorskip("python_calamine")
+
+from services.import_service import normalize_phone  # noqa: E402
+
+
+class TestNormalizePhone:
+    """normalize_phone edge cases"""
+
+    def test_strips_whitespace(self):
+        assert normalize_phone("  +79001234567 ") == "+79001234567"
+
+    def test_missing_or_blank_is_none(self):
+        assert normalize_phone(None) is None
+        assert normalize_phone("") is None
+        assert normalize_phone("   ") is None
+
+    def test_empty_numeric_cell_is_none(self):
+        """Empty numeric spreadsheet cells arrive as NaN and must not become the phone "nan" """
+        assert normalize_phone(float("nan")) is None
+
+    def test_integral_float_drops_trailing_zero(self):
+        assert normalize_phone(79001234567.0) == "79001234567"
+
+    def test_int_is_stringified(self):
+        assert normalize_phone(79001234567) == "79001234567"
@@ -0,0 +1,119 @@
+"""
+Voice message route tests
+Tests for: copying uploads to disk, bulk delete
+"""
+import asyncio
+import os
+import sys
+from tempfile import SpooledTemporaryFile
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+# The Mongo client only connects on first use, so importing the routers needs no server
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:1')
+os.environ.setdefault('DB_NAME', 'test_database')
+
+from models.schemas import VoiceMessageBulkDelete  # noqa: E402
+from routers import voice  # noqa: E402
+from routers.voice import COPY_CHUNK_SIZE, copy_upload  # noqa: E402
+
+
+def spooled_upload(data: bytes, max_size: int) -> SpooledTemporaryFile:
+    """An upload spooled the way Starlette does it, rewound for reading"""
+    src = SpooledTemporaryFile(max_size=max_size)
+    src.write(data)
+    src.seek(0)
+    return src
+
+
+class TestCopyUpload:
+    """copy_upload for in-memory and rolled-over uploads"""
+
+    def test_in_memory_upload(self, tmp_path):
+        data = os.urandom(1000)
+        src = spooled_upload(data, max_size=1 << 20)
+        assert not src._rolled
+
+        with open(tmp_path / "out", "wb") as out:
+            assert copy_upload(src, out) == len(data)
+        assert (tmp_path / "out").read_bytes() == data
+
+    def test_rolled_over_upload(self, tmp_path):
+        # More than one buffer's worth, so the copy loops
+        data = os.urandom(COPY_CHUNK_SIZE * 2 + 123)
+        src = spooled_upload(data, max_size=1024)
+        assert src._rolled
+
+        with open(tmp_path / "out", "wb") as out:
+            assert copy_upload(src, out) == len(data)
+        assert (tmp_path / "out").read_bytes() == data
+
+    def test_empty_upload(self, tmp_path):
+        src = spooled_upload(b"", max_size=1024)
+
+        with open(tmp_path / "out", "wb") as out:
+            assert copy_upload(src, out) == 0
+        assert (tmp_path / "out").read_bytes() == b""
+
+
+class FakeVoiceMessages:
+    """voice_messages find/delete_many over a list, matching id $in and user_id"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def matches(self, doc, query):
+        return doc["id"] in query["id"]["$in"] and doc["user_id"] == query["user_id"]
+
+    def find(self, query, projection=None):
+        found = [{"filename": d["filename"]} for d in self.docs if self.matches(d, query)]
+
+        async def to_list(length=None):
+            return found
+        return SimpleNamespace(to_list=to_list)
+
+    async def delete_many(self, query):
+        kept = [d for d in self.docs if not self.matches(d, query)]
+        deleted = len(self.docs) - len(kept)
+        self.docs[:] = kept
+        return SimpleNamespace(deleted_count=deleted)
+
+
+class TestBulkDelete:
+    """POST /voice-messages/bulk-delete"""
+
+    @pytest.fixture
+    def voices(self, monkeypatch, tmp_path):
+        docs = [
+            {"id": "v1", "user_id": "owner", "filename": "v1.ogg"},
+            {"id": "v2", "user_id": "owner", "filename": "v2.mp3"},
+            {"id": "v3", "user_id": "other", "filename": "v3.ogg"},
+        ]
+        for doc in docs:
+            (tmp_path / doc["filename"]).write_bytes(b"audio")
+        monkeypatch.setattr(voice, "db", SimpleNamespace(voice_messages=FakeVoiceMessages(docs)))
+        monkeypatch.setattr(voice, "UPLOAD_DIR", tmp_path)
+        return docs
+
+    def bulk_delete(self, ids, user_id="owner"):
+        return asyncio.run(voice.bulk_delete_voice_messages(VoiceMessageBulkDelete(ids=ids), {"id": user_id}))
+
+    def test_deletes_own_messages_and_files(self, voices, tmp_path):
+        result = self.bulk_delete(["v1", "v2"])
+        assert result["deleted"] == 2
+        assert [d["id"] for d in voices] == ["v3"]
+        assert not (tmp_path / "v1.ogg").exists()
+        assert not (tmp_path / "v2.mp3").exists()
+
+    def test_other_users_messages_are_left_alone(self, voices, tmp_path):
+        result = self.bulk_delete(["v1", "v3"])
+        assert result["deleted"] == 1
+        assert [d["id"] for d in voices] == ["v2", "v3"]
+        assert not (tmp_path / "v1.ogg").exists()
+        assert (tmp_path / "v3.ogg").exists()
+
+    def test_missing_file_is_not_an_error(self, voices, tmp_path):
+        (tmp_path / "v1.ogg").unlink()
+        assert self.bulk_delete(["v1"])["deleted"] == 1